@@ -0,0 +1,37 @@
+"""Post full text search
+
+Revision ID: 3f2a9c1d7e54
+Revises: c9360b472b08
+Create Date: 2026-10-18 10:12:41.508327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.post_models import POST_SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e54'
+down_revision = 'c9360b472b08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for statement in POST_SEARCH_DDL.get(dialect, []):
+        op.execute(statement)
+    if dialect == "sqlite":
+        op.execute("INSERT INTO post_fts(post_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.drop_index("ix_post_search_vector", table_name="post")
+        op.drop_column("post", "search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("post_fts_insert", "post_fts_delete", "post_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS post_fts")
@@ -0,0 +1,36 @@
+"""Post counters on category, tag and user
+
+Revision ID: 453e68db3a24
+Revises: 8b41e0d2c6fa
+Create Date: 2026-10-18 17:21:08.613402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '453e68db3a24'
+down_revision = '8b41e0d2c6fa'
+branch_labels = None
+depends_on = None
+
+COUNTED = {
+    "category": "SELECT count(*) FROM post WHERE post.category_id = category.id",
+    "tag": "SELECT count(*) FROM post_tag WHERE post_tag.tag_id = tag.id",
+    "user": 'SELECT count(*) FROM post WHERE post.author_id = "user".id',
+}
+
+
+def upgrade() -> None:
+    for table, count in COUNTED.items():
+        op.add_column(
+            table,
+            sa.Column("post_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+        op.execute(f'UPDATE "{table}" SET post_count = ({count})')
+
+
+def downgrade() -> None:
+    for table in COUNTED:
+        op.drop_column(table, "post_count")
@@ -0,0 +1,30 @@
+"""User directory trigram indexes
+
+Revision ID: 8b41e0d2c6fa
+Revises: 3f2a9c1d7e54
+Create Date: 2026-10-18 11:03:17.240915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.user_models import USER_TRIGRAM_DDL
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41e0d2c6fa'
+down_revision = '3f2a9c1d7e54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        for statement in USER_TRIGRAM_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        for column in ("first_name", "last_name", "email", "username"):
+            op.drop_index(f"ix_user_{column}_trgm", table_name="user")
@@ -0,0 +1,30 @@
+"""Post view counts
+
+Revision ID: e71d5a09b3c8
+Revises: 453e68db3a24
+Create Date: 2026-10-18 18:02:41.305817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71d5a09b3c8'
+down_revision = '453e68db3a24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "post_view",
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("views", sa.Integer(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["post_id"], ["post.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("post_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("post_view")
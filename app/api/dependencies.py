@@ -1,39 +1,131 @@
 """
     DEPENDENCIES FILE FOR ROUTES
 """
-from typing import Generator
-from fastapi import Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
+import hashlib
+import math
+import time
+from typing import AsyncGenerator, Generator, Optional
+from fastapi import Depends, HTTPException, Query, Request, Response
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security.utils import get_authorization_scheme_param
 from jose import jwt
 from pydantic import ValidationError
+from sqlalchemy import event
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.core import security
+from app.core.cache import token_cache, user_cache
 from app.core.configuration import settings
-from app.db.session import SessionLocal
-from app.exception.base_exception import invalid_credentials, user_not_found
+from app.core.rate_limit import (
+    login_account_limiter,
+    login_ip_limiter,
+    write_account_limiter,
+    write_ip_limiter,
+)
+from app.core.pagination import PageOrder, Pagination, decode_cursor
+from app.db.session import AsyncSessionLocal, SessionLocal, get_engine, read_replicas
+from app.exception.base_exception import (
+    invalid_credentials,
+    invalid_cursor,
+    not_enough_privileges,
+    user_not_found,
+)
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/login")
 
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
 
 def get_db() -> Generator:
     """
     Returns a new database session
     """
     try:
-        db_session = SessionLocal()
+        db_session = SessionLocal(bind=get_engine())
         yield db_session
     finally:
         db_session.close()
 
 
-def get_current_user(
-    db_session: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> models.User:
+def pin_reads_to_primary(response: Response) -> None:
+    """
+    Set the cookie sending the client reads to the primary for
+    READ_YOUR_WRITES_SECONDS
     """
-    Return the current user
+    until = time.time() + settings.READ_YOUR_WRITES_SECONDS
+    response.set_cookie(
+        settings.READ_YOUR_WRITES_COOKIE,
+        str(until),
+        max_age=math.ceil(settings.READ_YOUR_WRITES_SECONDS),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+async def get_async_db(request: Request, response: Response) -> AsyncGenerator:
+    """
+    Returns a new async database session bound to the primary. Writing
+    requests that commit get a cookie sending the client reads to the
+    primary too, so it does not read its writes from a lagging replica.
+    Requests failing before their commit (401, 404, 422, 429...) do not
+    """
+    async with AsyncSessionLocal() as db_session:
+        if request.method not in SAFE_METHODS:
+            event.listen(
+                db_session.sync_session,
+                "after_commit",
+                lambda session: pin_reads_to_primary(response),
+            )
+        yield db_session
+
+
+def wrote_recently(request: Request) -> bool:
+    """
+    Whether the client sent a write within the read-your-writes window
     """
+    try:
+        until = float(request.cookies.get(settings.READ_YOUR_WRITES_COOKIE, ""))
+    except ValueError:
+        return False
+    return until > time.time()
+
+
+async def get_read_db(request: Request) -> AsyncGenerator:
+    """
+    Returns a new async database session for read-only endpoints, bound to a
+    healthy read replica. Falls back to the primary when no replica is up or
+    the client wrote recently; a replica failing a query is taken out of
+    rotation until its next health check
+    """
+    engine = None
+    if not wrote_recently(request):
+        engine = await read_replicas.pick()
+    if engine is None:
+        async with AsyncSessionLocal() as db_session:
+            yield db_session
+        return
+
+    async with AsyncSessionLocal(bind=engine) as db_session:
+        try:
+            yield db_session
+        except (InterfaceError, OperationalError, OSError):
+            read_replicas.mark_down(engine)
+            raise
+
+
+def get_token_payload(token: str) -> schemas.TokenPayload:
+    """
+    Return the validated payload of a token, tokens seen before are served
+    from the token cache until they expire, skipping the signature check
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(digest)
+    if token_data is not None:
+        return token_data
+
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -43,7 +135,97 @@ def get_current_user(
     except (jwt.JWTError, ValidationError) as excep:
         raise invalid_credentials from excep
 
-    user = crud.user.get(db_session, id_value=token_data.sub)
-    if not user:
+    expires_at = None
+    if isinstance(payload.get("exp"), (int, float)):
+        expires_at = time.monotonic() + payload["exp"] - time.time()
+    token_cache.set(digest, token_data, expires_at=expires_at)
+    return token_data
+
+
+async def get_current_user(
+    db_session: AsyncSession = Depends(get_async_db),
+    token: str = Depends(reusable_oauth2),
+) -> schemas.UserSnapshot:
+    """
+    Return a snapshot of the current user, served from the user cache when
+    possible so authenticated requests skip the user lookup
+    """
+    token_data = get_token_payload(token)
+
+    user = user_cache.get(token_data.sub)
+    if user is not None:
+        return user
+
+    db_user = await crud.user.get_async(db_session, id_value=token_data.sub)
+    if not db_user:
         raise user_not_found
+    user = schemas.UserSnapshot.from_orm(db_user)
+    user_cache.set(user.id, user)
     return user
+
+
+async def get_current_admin(
+    current_user: schemas.UserSnapshot = Depends(get_current_user),
+) -> schemas.UserSnapshot:
+    """
+    Return the current user if it is an admin
+    """
+    if not current_user.is_admin:
+        raise not_enough_privileges
+    return current_user
+
+
+def get_pagination(
+    cursor: Optional[str] = None,
+    limit: int = Query(
+        settings.PAGINATION_DEFAULT_LIMIT, ge=1, le=settings.PAGINATION_MAX_LIMIT
+    ),
+    order_by: PageOrder = PageOrder.ID,
+) -> Pagination:
+    """
+    Return the keyset pagination parameters of a list request
+    """
+    if cursor is None:
+        return Pagination(limit=limit, order_by=order_by)
+    try:
+        after_value, after_id = decode_cursor(cursor, order_by)
+    except ValueError as excep:
+        raise invalid_cursor from excep
+    return Pagination(
+        limit=limit, order_by=order_by, after_value=after_value, after_id=after_id
+    )
+
+
+def client_ip(request: Request) -> str:
+    """
+    Return the address of the client, the key of the per ip rate limits
+    """
+    return request.client.host if request.client else "unknown"
+
+
+async def limit_login(
+    request: Request, form_data: OAuth2PasswordRequestForm = Depends()
+) -> None:
+    """
+    Rate limit login attempts per client ip and per account, before the user
+    lookup and the password verify
+    """
+    await login_ip_limiter.hit(client_ip(request))
+    await login_account_limiter.hit(form_data.username.strip().lower())
+
+
+async def limit_writes(request: Request) -> None:
+    """
+    Rate limit the create / update / delete routes per client ip and, when a
+    valid token is sent, per user. Runs before the database session opens
+    """
+    await write_ip_limiter.hit(client_ip(request))
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    if scheme.lower() != "bearer" or not token:
+        return
+    try:
+        subject = get_token_payload(token).sub
+    except HTTPException:
+        # rejected by the route's own authentication
+        return
+    await write_account_limiter.hit(str(subject))
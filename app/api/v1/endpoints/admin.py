@@ -0,0 +1,121 @@
+"""
+    ADMIN ENDPOINTS
+"""
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, Request
+
+from app.api import dependencies
+from app.core.cache import token_cache, user_cache
+from app.core.response_cache import response_cache
+from app.core.security import password_service
+from app.core.admission import admission_limiters
+from app.core.rate_limit import rate_limit_stats
+from app.core.view_counter import view_counter
+from app.db.pool import pool_metrics
+from app.db.session import read_replicas
+from app.logger import log_stats
+from app.core.responses import FastJSONRoute
+from app.schemas import UserSnapshot
+
+
+router = APIRouter(route_class=FastJSONRoute)
+
+
+@router.get("/password", response_model=Dict[str, Any])
+async def get_password_service_stats(
+    request: Request,
+    current_user: UserSnapshot = Depends(dependencies.get_current_admin),
+):
+    """
+    API for getting the counters of the password hashing pool
+    """
+
+    return password_service.stats()
+
+
+@router.get("/cache", response_model=List[Dict[str, Any]])
+async def get_cache_stats(
+    request: Request,
+    current_user: UserSnapshot = Depends(dependencies.get_current_admin),
+):
+    """
+    API for getting the hit / miss counters of the in-process caches
+    """
+
+    return [user_cache.stats(), token_cache.stats(), response_cache.stats()]
+
+
+@router.get("/replicas", response_model=Dict[str, Any])
+async def get_replica_stats(
+    request: Request,
+    current_user: UserSnapshot = Depends(dependencies.get_current_admin),
+):
+    """
+    API for getting the health of the read replicas
+    """
+
+    return read_replicas.stats()
+
+
+@router.get("/pools", response_model=List[Dict[str, Any]])
+async def get_pool_stats(
+    request: Request,
+    current_user: UserSnapshot = Depends(dependencies.get_current_admin),
+):
+    """
+    API for getting the live state and checkout wait histogram of every
+    connection pool
+    """
+
+    return [metrics.stats() for metrics in pool_metrics.values()]
+
+
+@router.get("/logging", response_model=Dict[str, Any])
+async def get_logging_stats(
+    request: Request,
+    current_user: UserSnapshot = Depends(dependencies.get_current_admin),
+):
+    """
+    API for getting the queue depth, written, dropped and sampled out
+    counters of the logging pipeline
+    """
+
+    return log_stats()
+
+
+@router.get("/rate-limits", response_model=Dict[str, Any])
+async def get_rate_limit_stats(
+    request: Request,
+    current_user: UserSnapshot = Depends(dependencies.get_current_admin),
+):
+    """
+    API for getting the allowed and limited counters of the rate limiters
+    """
+
+    return rate_limit_stats()
+
+
+@router.get("/admission", response_model=List[Dict[str, Any]])
+async def get_admission_stats(
+    request: Request,
+    current_user: UserSnapshot = Depends(dependencies.get_current_admin),
+):
+    """
+    API for getting the adaptive concurrency limit, queue and shed counters
+    of every route class
+    """
+
+    return [limiter.stats() for limiter in admission_limiters.values()]
+
+
+@router.get("/view-counts", response_model=Dict[str, Any])
+async def get_view_count_stats(
+    request: Request,
+    current_user: UserSnapshot = Depends(dependencies.get_current_admin),
+):
+    """
+    API for getting the pending and written post view counts of this worker
+    """
+
+    return view_counter.stats()
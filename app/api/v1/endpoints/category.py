@@ -1,94 +1,125 @@
 """
     CATEGORY ENDPOINTS
 """
-from typing import Any, List
+from typing import Any, List, Tuple
 
 from fastapi import APIRouter, Depends, BackgroundTasks, Request, Response
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models
+from app.core.conditional import Validators, is_not_modified, not_modified_response
+from app.core.pagination import Pagination
+from app.core.response_cache import cached_response
 from app.api import dependencies
+from app.core.responses import FastJSONRoute, dumps
 from app.exception.base_exception import category_not_found
 from app.logger import logger
 
-from app.schemas import CategoryCreate, CategoryDisplay, CategoryUpdate
+from app.schemas import (
+    CategoryCreate,
+    CategoryDisplay,
+    CategoryUpdate,
+    Page,
+    UserSnapshot,
+)
 
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
-@router.get("/", response_model=List[CategoryDisplay])
+@router.get("/", response_model=Page[CategoryDisplay])
 async def get_categories(
     request: Request,
-    db_session: Session = Depends(dependencies.get_db),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    pagination: Pagination = Depends(dependencies.get_pagination),
 ):
     """
-    API for getting all categories
+    API for getting all categories, the serialized page is cached until the next
+    category write. Misses are built from the primary, a page read from a lagging
+    replica right after an invalidation would stay cached
     """
-    categories = jsonable_encoder(crud.category.get_multi_without_limit(db_session))
 
-    return categories
+    async def build() -> Tuple[bytes, Validators]:
+        validators = await crud.category.get_validators_async(db_session)
+        categories, next_cursor = await crud.category.get_page_async(
+            db_session, pagination
+        )
+        page = Page[CategoryDisplay](items=categories, next_cursor=next_cursor)
+        return dumps(page), validators
+
+    return await cached_response("category", request, build)
 
 
-@router.post("/create", response_model=CategoryDisplay)
+@router.post(
+    "/create",
+    response_model=CategoryDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def create_category(
     request: Request,
     category_in: CategoryCreate,
-    db_session: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
 ):
     """
     API for creating a new category
     """
 
-    category = jsonable_encoder(crud.category.create(db_session, obj_in=category_in))
+    category = await crud.category.create_async(db_session, obj_in=category_in)
 
     return category
 
 
-@router.patch("/update", response_model=CategoryDisplay)
+@router.patch(
+    "/update",
+    response_model=CategoryDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def update_category(
     request: Request,
     category_in: CategoryUpdate,
-    db_session: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
 ):
     """
     API for updating a category
     """
 
-    db_obj = crud.category.get(db_session, id_value=category_in.id)
+    db_obj = await crud.category.get_async(db_session, id_value=category_in.id)
 
     if not db_obj:
         logger.error("Category with id %s not found", category_in.id)
         return category_not_found
 
-    category = jsonable_encoder(
-        crud.category.update(db_session, db_obj=db_obj, obj_in=category_in)
+    category = await crud.category.update_async(
+        db_session, db_obj=db_obj, obj_in=category_in
     )
 
     return category
 
 
-@router.delete("/delete/{id}", response_model=CategoryDisplay)
+@router.delete(
+    "/delete/{id}",
+    response_model=CategoryDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def delete_category(
     request: Request,
     id: int,
-    db_session: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
 ):
     """
     API for deleting a category
     """
 
-    category = crud.category.get(db_session, id_value=id)
+    category = await crud.category.get_async(db_session, id_value=id)
 
     if not category:
         logger.error("Category with id %s not found", id)
         raise category_not_found
 
-    category = jsonable_encoder(crud.category.remove(db_session, id=id))
+    category = await crud.category.remove_async(db_session, id_value=id)
 
     return category
 
@@ -97,12 +128,19 @@ async def delete_category(
 async def search_category(
     request: Request,
     keyword: str,
-    db_session: Session = Depends(dependencies.get_db),
+    response: Response,
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
 ):
     """
     API for searching categories
     """
 
-    categories = jsonable_encoder(crud.category.search(db_session, keyword=keyword))
+    # any write to the table may change the matches
+    validators = await crud.category.get_validators_async(db_session)
+    if is_not_modified(request, validators):
+        return not_modified_response(validators)
+    response.headers.update(validators.headers)
+
+    categories = await crud.category.search_async(db_session, keyword=keyword)
 
     return categories
@@ -6,28 +6,31 @@ from typing import Any
 
 from fastapi import APIRouter, Body, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models, schemas
 from app.api import dependencies
 from app.core import security
 from app.core.configuration import settings
-from app.core.security import get_password_hash
+from app.core.responses import FastJSONRoute
 from app.exception.base_exception import invalid_credentials
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
-@router.post("/", response_model=schemas.Token)
-def login_access_token(
-    db: Session = Depends(dependencies.get_db),
+@router.post(
+    "/",
+    response_model=schemas.Token,
+    dependencies=[Depends(dependencies.limit_login)],
+)
+async def login_access_token(
+    db: AsyncSession = Depends(dependencies.get_async_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
     """
     API for generating access token
     """
-    user = crud.user.authenticate(
+    user = await crud.user.authenticate_async(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -42,10 +45,10 @@ def login_access_token(
 
 
 @router.post("/test-token", response_model=schemas.UserDisplay)
-def test_token(
-    current_user: models.User = Depends(dependencies.get_current_user),
+async def test_token(
+    current_user: schemas.UserSnapshot = Depends(dependencies.get_current_user),
 ) -> Any:
     """
     Test access token
     """
-    return jsonable_encoder(current_user)
+    return current_user
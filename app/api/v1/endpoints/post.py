@@ -1,15 +1,23 @@
 """
     POST ENDPOINTS
 """
-from typing import Any, List
+import zlib
+from typing import Any, AsyncIterator, List
 
-from fastapi import APIRouter, Depends, BackgroundTasks, Request, Response
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, BackgroundTasks, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models
 from app.api import dependencies
+from app.core.conditional import is_not_modified, not_modified_response
+from app.core.configuration import settings
+from app.core.pagination import Pagination
+from app.core.responses import FastJSONRoute, dumps
+from app.core.view_counter import view_counter
 from app.exception.base_exception import (
+    bulk_too_large,
     post_not_found,
     post_not_found_by_user,
     user_not_found,
@@ -18,180 +26,332 @@ from app.exception.base_exception import (
 )
 from app.logger import logger
 
-from app.schemas import PostCreate, PostDisplay, PostUpdate, PostDisplayDetailed
+from app.schemas import (
+    BulkResult,
+    Page,
+    PostCreate,
+    PostDisplay,
+    PostUpdate,
+    PostDisplayDetailed,
+    PostSearchResult,
+    UserSnapshot,
+)
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
-@router.get("/{id}", response_model=PostDisplayDetailed)
+@router.get("/{id:int}", response_model=PostDisplayDetailed)
 async def get_post(
     request: Request,
     id: int,
-    db_session: Session = Depends(dependencies.get_db),
+    response: Response,
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
 ):
     """
-    API for getting a post
+    API for getting a post. The view is counted in memory and written in
+    a later batch, `views` lags behind by up to VIEW_COUNT_FLUSH_SECONDS
     """
 
-    post = crud.post.get(db_session, id_value=id)
+    validators = await crud.post.get_validators_async(
+        db_session, models.Post.id == id, columns=[func.sum(models.Post.views)]
+    )
+    if is_not_modified(request, validators):
+        view_counter.record(id)
+        return not_modified_response(validators)
+    response.headers.update(validators.headers)
+
+    post = await crud.post.get_async(db_session, id_value=id)
 
     if not post:
         logger.error("Post with id %s not found", id)
         raise post_not_found
 
+    view_counter.record(id)
     return post
 
 
-@router.get("/", response_model=List[PostDisplay])
+@router.get("/export", response_class=StreamingResponse)
+async def export_posts(
+    request: Request,
+    gzip: bool = False,
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_admin),
+):
+    """
+    API for exporting every post as NDJSON, one `PostDisplayDetailed` per
+    line, streamed batch by batch from a server-side cursor
+    """
+
+    async def ndjson() -> AsyncIterator[bytes]:
+        async for batch in crud.post.stream_async(
+            db_session, batch_size=settings.EXPORT_BATCH_SIZE
+        ):
+            yield b"".join(
+                dumps(PostDisplayDetailed.from_orm(post)) + b"\n" for post in batch
+            )
+
+    async def gzipped() -> AsyncIterator[bytes]:
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        async for chunk in ndjson():
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    if gzip:
+        return StreamingResponse(
+            gzipped(),
+            media_type="application/gzip",
+            headers={"Content-Disposition": "attachment; filename=posts.ndjson.gz"},
+        )
+    return StreamingResponse(
+        ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=posts.ndjson"},
+    )
+
+
+@router.get("/", response_model=Page[PostDisplay])
 async def get_posts(
     request: Request,
-    db_session: Session = Depends(dependencies.get_db),
+    response: Response,
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
+    pagination: Pagination = Depends(dependencies.get_pagination),
 ):
     """
     API for getting all posts
     """
-    posts = crud.post.get_multi_without_limit(db_session)
 
-    return posts
+    posts, next_cursor = await crud.post.get_page_async(db_session, pagination)
 
+    validators = crud.post.get_page_validators(posts, next_cursor)
+    if is_not_modified(request, validators):
+        return not_modified_response(validators)
+    response.headers.update(validators.headers)
 
-@router.post("/create", response_model=PostDisplay)
+    return {"items": posts, "next_cursor": next_cursor}
+
+
+@router.post(
+    "/create",
+    response_model=PostDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def create_post(
     request: Request,
     post_in: PostCreate,
-    db_session: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
 ):
     """
     API for creating a new post
     """
 
-    post = crud.post.create(db_session, obj_in=post_in)
+    post = await crud.post.create_async(db_session, obj_in=post_in)
 
     return post
 
 
-@router.patch("/update", response_model=PostDisplay)
+@router.post(
+    "/bulk",
+    response_model=BulkResult[PostDisplay],
+    dependencies=[Depends(dependencies.limit_writes)],
+)
+async def create_posts_bulk(
+    request: Request,
+    posts_in: List[PostCreate],
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
+):
+    """
+    API for creating many posts at once, invalid items are reported in
+    `errors` by index while the valid ones are created
+    """
+
+    if len(posts_in) > settings.BULK_MAX_ITEMS:
+        raise bulk_too_large
+
+    created, errors = await crud.post.create_many_async(db_session, objs_in=posts_in)
+
+    return {"created": created, "errors": errors}
+
+
+@router.patch(
+    "/update",
+    response_model=PostDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def update_post(
     request: Request,
     post_in: PostUpdate,
-    db_session: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
 ):
     """
     API for updating a post
     """
 
-    db_obj = crud.post.get(db_session, id_value=post_in.id)
+    db_obj = await crud.post.get_async(db_session, id_value=post_in.id)
 
     if not db_obj:
         logger.error("Post with id %s not found", post_in.id)
         return post_not_found
 
-    post = crud.post.update(db_session, db_obj=db_obj, obj_in=post_in)
+    post = await crud.post.update_async(db_session, db_obj=db_obj, obj_in=post_in)
 
     return post
 
 
-@router.delete("/delete/{id}", response_model=PostDisplay)
+@router.delete(
+    "/delete/{id}",
+    response_model=PostDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def delete_post(
     request: Request,
     id: int,
-    db_session: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
 ):
     """
     API for deleting a post
     """
 
-    post = crud.post.get(db_session, id_value=id)
+    post = await crud.post.get_async(db_session, id_value=id)
 
     if not post:
         logger.error("Post with id %s not found", id)
         raise post_not_found
 
-    post = crud.post.remove(db_session, id=id)
+    post = await crud.post.remove_async(db_session, id_value=id)
 
     return post
 
 
-@router.get("/search", response_model=List[PostDisplayDetailed])
+@router.get("/search", response_model=List[PostSearchResult])
 async def search_post(
     request: Request,
     keyword: str,
-    db_session: Session = Depends(dependencies.get_db),
+    response: Response,
+    limit: int = Query(
+        settings.PAGINATION_DEFAULT_LIMIT, ge=1, le=settings.PAGINATION_MAX_LIMIT
+    ),
+    offset: int = Query(0, ge=0, le=settings.SEARCH_MAX_OFFSET),
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
 ):
     """
-    API for searching a post
+    API for searching a post, ranked by relevance
     """
 
-    posts = crud.post.search(db_session, keyword=keyword)
+    hits = await crud.post.search_ranked_async(
+        db_session, keyword=keyword, limit=limit, offset=offset
+    )
+
+    # the ranks also move with the rest of the table
+    validators = crud.post.get_page_validators(
+        [post for post, _, _ in hits], *[rank for _, rank, _ in hits]
+    )
+    if is_not_modified(request, validators):
+        return not_modified_response(validators)
+    response.headers.update(validators.headers)
 
-    return posts
+    return [
+        PostSearchResult(
+            **PostDisplayDetailed.from_orm(post).dict(), rank=rank, snippet=snippet
+        )
+        for post, rank, snippet in hits
+    ]
 
 
-@router.get("/byUser/{user_id}", response_model=List[PostDisplay])
+@router.get("/byUser/{user_id}", response_model=Page[PostDisplay])
 async def get_posts_by_user(
     request: Request,
     user_id: int,
-    db_session: Session = Depends(dependencies.get_db),
+    response: Response,
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
+    pagination: Pagination = Depends(dependencies.get_pagination),
 ):
     """
     API for getting all posts by user
     """
 
-    user = crud.user.get(db_session, id_value=user_id)
+    user = await crud.user.get_async(db_session, id_value=user_id)
 
     if not user:
         logger.error("User with id %s not found", user_id)
         raise user_not_found
 
-    posts = crud.post.get_multi_by_user(db_session, user_id=user_id)
+    posts, next_cursor = await crud.post.get_page_by_user_async(
+        db_session, user_id=user_id, pagination=pagination
+    )
 
-    if not posts:
+    if not posts and pagination.is_first_page:
         logger.error("Post with user id %s not found", user_id)
         raise post_not_found_by_user
 
-    return posts
+    validators = crud.post.get_page_validators(posts, next_cursor)
+    if is_not_modified(request, validators):
+        return not_modified_response(validators)
+    response.headers.update(validators.headers)
 
+    return {"items": posts, "next_cursor": next_cursor}
 
-@router.get("/byCategory/{category_id}", response_model=List[PostDisplay])
+
+@router.get("/byCategory/{category_id}", response_model=Page[PostDisplay])
 async def get_posts_by_category(
     request: Request,
     category_id: int,
-    db_session: Session = Depends(dependencies.get_db),
+    response: Response,
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
+    pagination: Pagination = Depends(dependencies.get_pagination),
 ):
     """
     API for getting all posts by category
     """
 
-    category = crud.category.get(db_session, id_value=category_id)
+    category = await crud.category.get_async(db_session, id_value=category_id)
 
     if not category:
         logger.error("Category with id %s not found", category_id)
         raise category_not_found
 
-    posts = crud.post.get_multi_by_category(db_session, category_id=category_id)
+    posts, next_cursor = await crud.post.get_page_by_category_async(
+        db_session, category_id=category_id, pagination=pagination
+    )
+
+    validators = crud.post.get_page_validators(posts, next_cursor)
+    if is_not_modified(request, validators):
+        return not_modified_response(validators)
+    response.headers.update(validators.headers)
 
-    return posts
+    return {"items": posts, "next_cursor": next_cursor}
 
 
-@router.get("/byTag/{tag_id}", response_model=List[PostDisplay])
+@router.get("/byTag/{tag_id}", response_model=Page[PostDisplay])
 async def get_posts_by_tag(
     request: Request,
     tag_id: int,
-    db_session: Session = Depends(dependencies.get_db),
+    response: Response,
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
+    pagination: Pagination = Depends(dependencies.get_pagination),
 ):
     """
     API for getting all posts by tag
     """
 
-    tag = crud.tag.get(db_session, id_value=tag_id)
+    tag = await crud.tag.get_async(db_session, id_value=tag_id)
 
     if not tag:
         logger.error("Tag with id %s not found", tag_id)
         raise tag_not_found
 
-    posts = crud.post.get_multi_by_tag(db_session, tag_id=tag_id)
+    posts, next_cursor = await crud.post.get_page_by_tag_async(
+        db_session, tag_id=tag_id, pagination=pagination
+    )
+
+    validators = crud.post.get_page_validators(posts, next_cursor)
+    if is_not_modified(request, validators):
+        return not_modified_response(validators)
+    response.headers.update(validators.headers)
 
-    return posts
+    return {"items": posts, "next_cursor": next_cursor}
@@ -0,0 +1,30 @@
+"""
+    STATS ENDPOINTS
+"""
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.api import dependencies
+from app.core.configuration import settings
+from app.core.responses import FastJSONRoute
+from app.schemas import PostStats
+
+
+router = APIRouter(route_class=FastJSONRoute)
+
+
+@router.get("/posts", response_model=PostStats)
+async def get_post_stats(
+    request: Request,
+    limit: int = Query(
+        settings.PAGINATION_DEFAULT_LIMIT, ge=1, le=settings.PAGINATION_MAX_LIMIT
+    ),
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
+):
+    """
+    API for getting the categories, tags and authors with the most posts,
+    read from the maintained counters without scanning the posts
+    """
+
+    return await crud.post.get_count_stats_async(db_session, limit=limit)
@@ -1,92 +1,147 @@
 """
     TAG ENDPOINTS
 """
-from typing import Any, List
+from typing import Any, List, Tuple
 
 from fastapi import APIRouter, Depends, BackgroundTasks, Request, Response
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models
+from app.core.configuration import settings
+from app.core.conditional import Validators, is_not_modified, not_modified_response
+from app.core.pagination import Pagination
+from app.core.response_cache import cached_response
 from app.api import dependencies
-from app.exception.base_exception import tag_not_found
+from app.core.responses import FastJSONRoute, dumps
+from app.exception.base_exception import bulk_too_large, tag_not_found
 from app.logger import logger
 
-from app.schemas import TagCreate, TagDisplay, TagUpdate
+from app.schemas import (
+    BulkResult,
+    Page,
+    TagCreate,
+    TagDisplay,
+    TagUpdate,
+    UserSnapshot,
+)
 
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
-@router.get("/", response_model=List[TagDisplay])
+@router.get("/", response_model=Page[TagDisplay])
 async def get_tags(
     request: Request,
-    db_session: Session = Depends(dependencies.get_db),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    pagination: Pagination = Depends(dependencies.get_pagination),
 ):
     """
-    API for getting all categories
+    API for getting all tags, the serialized page is cached until the next
+    tag write. Misses are built from the primary, a page read from a lagging
+    replica right after an invalidation would stay cached
     """
-    tags = jsonable_encoder(crud.tag.get_multi_without_limit(db_session))
 
-    return tags
+    async def build() -> Tuple[bytes, Validators]:
+        validators = await crud.tag.get_validators_async(db_session)
+        tags, next_cursor = await crud.tag.get_page_async(db_session, pagination)
+        page = Page[TagDisplay](items=tags, next_cursor=next_cursor)
+        return dumps(page), validators
+
+    return await cached_response("tag", request, build)
 
 
-@router.post("/create", response_model=TagDisplay)
+@router.post(
+    "/create",
+    response_model=TagDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def create_tag(
     request: Request,
     tag_in: TagCreate,
-    db_session: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
 ):
     """
     API for creating a new tag
     """
 
-    tag = jsonable_encoder(crud.tag.create(db_session, obj_in=tag_in))
+    tag = await crud.tag.create_async(db_session, obj_in=tag_in)
 
     return tag
 
 
-@router.patch("/update", response_model=TagDisplay)
+@router.post(
+    "/bulk",
+    response_model=BulkResult[TagDisplay],
+    dependencies=[Depends(dependencies.limit_writes)],
+)
+async def create_tags_bulk(
+    request: Request,
+    tags_in: List[TagCreate],
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
+):
+    """
+    API for creating many tags at once, invalid items are reported in
+    `errors` by index while the valid ones are created
+    """
+
+    if len(tags_in) > settings.BULK_MAX_ITEMS:
+        raise bulk_too_large
+
+    created, errors = await crud.tag.create_many_async(db_session, objs_in=tags_in)
+
+    return {"created": created, "errors": errors}
+
+
+@router.patch(
+    "/update",
+    response_model=TagDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def update_tag(
     request: Request,
     tag_in: TagUpdate,
-    db_session: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
 ):
     """
     API for updating a tag
     """
 
-    db_obj = crud.tag.get(db_session, id_value=tag_in.id)
+    db_obj = await crud.tag.get_async(db_session, id_value=tag_in.id)
 
     if not db_obj:
         logger.error("Tag with id %s not found", tag_in.id)
         return tag_not_found
 
-    tag = jsonable_encoder(crud.tag.update(db_session, db_obj=db_obj, obj_in=tag_in))
+    tag = await crud.tag.update_async(db_session, db_obj=db_obj, obj_in=tag_in)
 
     return tag
 
 
-@router.delete("/delete/{id}", response_model=TagDisplay)
+@router.delete(
+    "/delete/{id}",
+    response_model=TagDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def delete_tag(
     request: Request,
     id: int,
-    db_session: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.get_current_user),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
+    current_user: UserSnapshot = Depends(dependencies.get_current_user),
 ):
     """
     API for deleting a tag
     """
 
-    tag = crud.tag.get(db_session, id_value=id)
+    tag = await crud.tag.get_async(db_session, id_value=id)
 
     if not tag:
         logger.error("Tag with id %s not found", id)
         raise tag_not_found
 
-    tag = jsonable_encoder(crud.tag.remove(db_session, id_value=id))
+    tag = await crud.tag.remove_async(db_session, id_value=id)
 
     return tag
 
@@ -95,12 +150,19 @@ async def delete_tag(
 async def search_tag(
     request: Request,
     keyword: str,
-    db_session: Session = Depends(dependencies.get_db),
+    response: Response,
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
 ):
     """
     API for searching a tag
     """
 
-    tags = jsonable_encoder(crud.tag.search(db_session, keyword=keyword))
+    # any write to the table may change the matches
+    validators = await crud.tag.get_validators_async(db_session)
+    if is_not_modified(request, validators):
+        return not_modified_response(validators)
+    response.headers.update(validators.headers)
+
+    tags = await crud.tag.search_async(db_session, keyword=keyword)
 
     return tags
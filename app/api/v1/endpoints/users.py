@@ -3,42 +3,50 @@
 """
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, BackgroundTasks, Request, Response
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, BackgroundTasks, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, schemas
 from app.api import dependencies
+from app.core.configuration import settings
+from app.core.pagination import Pagination
+from app.core.responses import FastJSONRoute
 from app.logger import logger
 from app.exception.base_exception import user_found, invalid_password, user_not_found
-from app.schemas.user_schema import UserDisplay
+from app.schemas import Page
+from app.schemas.user_schema import UserDisplay, UserSearchResult
 from app.utils import (
     is_email_valid,
     is_valid_password,
 )
 
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
-@router.get("/", response_model=List[UserDisplay])
+@router.get("/", response_model=Page[UserDisplay])
 async def get_users(
     request: Request,
-    db_session: Session = Depends(dependencies.get_db),
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
+    pagination: Pagination = Depends(dependencies.get_pagination),
 ):
     """
     API for getting all users
     """
-    users = jsonable_encoder(crud.user.get_multi(db_session))
+    users, next_cursor = await crud.user.get_page_async(db_session, pagination)
 
-    return users
+    return {"items": users, "next_cursor": next_cursor}
 
 
-@router.post("/create", response_model=UserDisplay)
+@router.post(
+    "/create",
+    response_model=UserDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def create_user(
     request: Request,
     user_in: schemas.UserCreate,
-    db_session: Session = Depends(dependencies.get_db),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
 ):
     """
     API for creating a new user
@@ -46,7 +54,7 @@ async def create_user(
 
     user_in.email = is_email_valid(email=user_in.email)
 
-    user = crud.user.get_by_email(db_session, email=user_in.email)
+    user = await crud.user.get_by_email_async(db_session, email=user_in.email)
     if user:
         logger.warning("User with email %s already exist", user_in.email)
         raise user_found
@@ -55,77 +63,91 @@ async def create_user(
         logger.error("Password %s is not valid", user_in.password)
         raise invalid_password
 
-    user = jsonable_encoder(crud.user.create(db_session, obj_in=user_in))
+    user = await crud.user.create_async(db_session, obj_in=user_in)
 
     return user
 
 
-@router.patch("/update", response_model=UserDisplay)
+@router.patch(
+    "/update",
+    response_model=UserDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def update_user(
     request: Request,
     user_in: schemas.UserUpdate,
-    db_session: Session = Depends(dependencies.get_db),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
 ):
     """
     API for updating a user
     """
-    user = crud.user.get_by_id(db_session, id_value=user_in.id)
+    user = await crud.user.get_by_id_async(db_session, id_value=int(user_in.id))
     if not user:
         logger.error("User with id %s not found", user_in.id)
         raise user_not_found
 
-    user = jsonable_encoder(crud.user.update(db_session, db_obj=user, obj_in=user_in))
+    user = await crud.user.update_async(db_session, db_obj=user, obj_in=user_in)
 
     return user
 
 
-@router.delete("/delete/{id}", response_model=UserDisplay)
+@router.delete(
+    "/delete/{id}",
+    response_model=UserDisplay,
+    dependencies=[Depends(dependencies.limit_writes)],
+)
 async def delete_user(
     request: Request,
     id: int,
-    db_session: Session = Depends(dependencies.get_db),
+    db_session: AsyncSession = Depends(dependencies.get_async_db),
 ):
     """
     API for deleting a user
     """
-    user = crud.user.get_by_id(db_session, id_value=id)
+    user = await crud.user.get_by_id_async(db_session, id_value=id)
     if not user:
         logger.error("User with id %s not found", id)
         raise user_not_found
 
-    user = jsonable_encoder(crud.user.remove(db_session, id_value=id))
+    user = await crud.user.remove_async(db_session, id_value=id)
 
     return user
 
 
-@router.post("/search", response_model=List[UserDisplay])
+@router.post("/search", response_model=List[UserSearchResult])
 async def search_user(
     request: Request,
     keyword: str,
-    db_session: Session = Depends(dependencies.get_db),
+    limit: int = Query(
+        settings.PAGINATION_DEFAULT_LIMIT, ge=1, le=settings.PAGINATION_MAX_LIMIT
+    ),
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
 ):
     """
-    API for searching a user
+    API for searching a user, ranked by trigram similarity
     """
-    users = jsonable_encoder(crud.user.search(db_session, keyword=keyword))
+    hits = await crud.user.search_directory_async(
+        db_session, keyword=keyword, limit=limit
+    )
 
-    return users
+    return [
+        UserSearchResult(**UserDisplay.from_orm(user).dict(), score=score)
+        for user, score in hits
+    ]
 
 
 @router.get("/getById", response_model=UserDisplay)
 async def get_user_by_id(
     request: Request,
     id: int,
-    db_session: Session = Depends(dependencies.get_db),
+    db_session: AsyncSession = Depends(dependencies.get_read_db),
 ):
     """
     API for getting a user by id
     """
-    user = crud.user.get_by_id(db_session, id_value=id)
+    user = await crud.user.get_by_id_async(db_session, id_value=id)
     if not user:
         logger.error("User with id %s not found", id)
         raise user_not_found
 
-    user = jsonable_encoder(user)
-
     return user
@@ -1,7 +1,7 @@
 """
     ROUTER FILE
 """
-from fastapi import APIRouter
+from fastapi import FastAPI
 
 from app.api.v1.endpoints import (
     users,
@@ -9,12 +9,27 @@ from app.api.v1.endpoints import (
     category,
     tag,
     post,
+    admin,
+    stats,
 )
 
-api_router = APIRouter()
+# (router, prefix, tags) of the API, the app includes them directly so each
+# route is only copied once more (an intermediate router doubled the cost of
+# building the routes at import)
+api_routers = [
+    (login.router, "/login", ["Login"]),
+    (users.router, "/users", ["Users"]),
+    (category.router, "/category", ["Category"]),
+    (tag.router, "/tag", ["Tag"]),
+    (post.router, "/post", ["Post"]),
+    (admin.router, "/admin", ["Admin"]),
+    (stats.router, "/stats", ["Stats"]),
+]
 
-api_router.include_router(login.router, prefix="/login", tags=["Login"])
-api_router.include_router(users.router, prefix="/users", tags=["Users"])
-api_router.include_router(category.router, prefix="/category", tags=["Category"])
-api_router.include_router(tag.router, prefix="/tag", tags=["Tag"])
-api_router.include_router(post.router, prefix="/post", tags=["Post"])
+
+def include_api_routers(app: FastAPI, prefix: str) -> None:
+    """
+    Method to add the API routes to the app under `prefix`
+    """
+    for router, router_prefix, tags in api_routers:
+        app.include_router(router, prefix=prefix + router_prefix, tags=tags)
@@ -0,0 +1,238 @@
+"""
+    ADMISSION CONTROL FILE
+"""
+import asyncio
+import collections
+import time
+from typing import Any, Callable, Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.configuration import settings
+from app.exception.base_exception import service_overloaded
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# responses streamed for a long time, limited apart so a few of them can not
+# hold every read slot
+STREAMING_PATHS = {settings.API_V1_STR + "/post/export"}
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit adapted with AIMD: the limit grows by one per limit's
+    worth of requests finishing under the target latency while it is fully
+    used, and is cut by `backoff` (at most once per target latency) when a
+    request is slower or fails. Requests over the limit wait in a bounded
+    FIFO queue, and are rejected when it is full or their wait times out
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency: float,
+        queue_size: int,
+        queue_timeout: float,
+        backoff: float = 0.9,
+    ):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = collections.deque()
+        self._decreased_at = float("-inf")
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    async def acquire(self) -> bool:
+        """
+        Take a slot, waiting in the queue if needed. Return False when the
+        request has to be shed
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over before the request went away
+                self.in_flight -= 1
+                self._hand_over()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over as the wait timed out
+                self.admitted += 1
+                return True
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+            self.timeouts += 1
+            self.rejected += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def release(self, latency: float, failed: bool) -> None:
+        """
+        Give the slot back, adapt the limit to the request outcome and hand
+        the free slots over to the waiting requests
+        """
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        now = time.monotonic()
+        if failed or latency > self.target_latency:
+            if now - self._decreased_at >= self.target_latency:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._decreased_at = now
+        elif saturated or self._waiters:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self._hand_over()
+
+    def _hand_over(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            waiter.set_result(None)
+            self.in_flight += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the current limit and the counters of the limiter
+        """
+        return {
+            "name": self.name,
+            "limit": round(self.limit, 2),
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+def route_class(scope: Scope) -> Optional[str]:
+    """
+    Return the limiter of a request: "auth" for the login routes, "stream"
+    for the streamed exports, "write" for the unsafe methods, "read"
+    otherwise. Requests outside the API (the docs, `/metrics`) are not
+    limited
+    """
+    path = scope["path"]
+    if not path.startswith(settings.API_V1_STR + "/"):
+        return None
+    if path.startswith(settings.API_V1_STR + "/login"):
+        return "auth"
+    if path in STREAMING_PATHS:
+        return "stream"
+    if scope["method"] in SAFE_METHODS:
+        return "read"
+    return "write"
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware running every API request through the limiter of
+    its route class, and answering 503 right away when it is shed
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: Dict[str, AdaptiveLimiter],
+        classify: Callable[[Scope], Optional[str]] = route_class,
+    ):
+        self.app = app
+        self.limiters = limiters
+        self.classify = classify
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = None
+        if scope["type"] == "http":
+            limiter = self.limiters.get(self.classify(scope) or "")
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            response = JSONResponse(
+                status_code=service_overloaded.status_code,
+                content={"message": service_overloaded.detail},
+                headers=service_overloaded.headers,
+            )
+            await response(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            limiter.release(time.perf_counter() - start, failed=status_code >= 500)
+
+
+# a limit above the connection pool only moves the queue to the pool
+POOL_SIZE = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+
+def max_limit(initial: int) -> int:
+    """
+    Method to get the max limit of a class: ADMISSION_MAX_LIMIT when set,
+    otherwise the share of the pool its initial limit asks for, so the
+    classes together never hold more than the pool and one class (exports)
+    can not take every connection
+    """
+    if settings.ADMISSION_MAX_LIMIT:
+        return settings.ADMISSION_MAX_LIMIT
+    share = POOL_SIZE * initial // sum(settings.ADMISSION_LIMITS.values())
+    return max(settings.ADMISSION_MIN_LIMIT, share)
+
+
+admission_limiters = {
+    name: AdaptiveLimiter(
+        name,
+        initial=min(initial, max_limit(initial)),
+        min_limit=settings.ADMISSION_MIN_LIMIT,
+        max_limit=max_limit(initial),
+        target_latency=settings.ADMISSION_TARGET_LATENCY_MS[name] / 1000,
+        queue_size=settings.ADMISSION_QUEUE_SIZE,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    )
+    for name, initial in settings.ADMISSION_LIMITS.items()
+}
@@ -0,0 +1,91 @@
+"""
+    CONDITIONAL REQUEST FILE
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+
+@dataclass(frozen=True)
+class Validators:
+    """
+    ETag and Last-Modified of a representation
+    """
+
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """
+        Response headers carrying the validators
+        """
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+
+def make_validators(
+    *parts: Any, last_modified: Optional[datetime] = None
+) -> Validators:
+    """
+    Build weak validators from the aggregates describing a result (row
+    counts, latest modification times...). Naive datetimes are taken as UTC
+    and truncated to the second, the resolution of Last-Modified
+    """
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+    digest = hashlib.sha1(
+        "|".join(
+            value.isoformat() if isinstance(value, datetime) else str(value)
+            for value in parts
+        ).encode()
+    ).hexdigest()
+    return Validators(etag='W/"' + digest[:20] + '"', last_modified=last_modified)
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    """
+    Whether the client copy is still current. If-None-Match wins over
+    If-Modified-Since when both are sent
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {_opaque_tag(tag) for tag in if_none_match.split(",")}
+        return _opaque_tag(validators.etag) in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or validators.last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return validators.last_modified <= since
+
+
+def _opaque_tag(etag: str) -> str:
+    """
+    Strip the weak prefix of an entity tag, If-None-Match uses the weak
+    comparison
+    """
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def not_modified_response(validators: Validators) -> Response:
+    """
+    Empty 304 response carrying the validators
+    """
+    return Response(status_code=304, headers=validators.headers)
@@ -3,7 +3,7 @@
 """
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from pydantic import (
     AnyHttpUrl,
     BaseSettings,
@@ -26,8 +26,75 @@ class Settings(BaseSettings):
     """
 
     API_V1_STR: str = os.environ.get("API_V1_STR")
+    # adds the per request query stats to the response headers
+    DEBUG: bool = False
     SECRET_KEY: str = os.environ.get("SECRET_KEY")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 90
+    PAGINATION_DEFAULT_LIMIT: int = 20
+    PAGINATION_MAX_LIMIT: int = 100
+    SEARCH_MAX_OFFSET: int = 1000
+    BULK_MAX_ITEMS: int = 1000
+    EXPORT_BATCH_SIZE: int = 500
+    FAST_JSON_RESPONSES: bool = True
+    METRICS_ENABLED: bool = True
+    # directory shared by the workers to aggregate their metrics, the
+    # metrics only cover the worker serving `/metrics` when unset
+    METRICS_DIR: Optional[str] = None
+    METRICS_FLUSH_SECONDS: float = 5
+    USER_SEARCH_THRESHOLD: float = 0.3
+    # the in-process directory index (without pg_trgm) is rebuilt this often
+    # to pick up the users written by the other workers
+    USER_SEARCH_INDEX_TTL_SECONDS: float = 60
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: float = 60
+    TOKEN_CACHE_SIZE: int = 4096
+    RESPONSE_CACHE_SIZE: int = 256
+    RESPONSE_CACHE_TTL_SECONDS: float = 300
+    RESPONSE_CACHE_URL: Optional[str] = None
+    # concurrency limits of the read / write / auth routes, adapted between
+    # the min and max limit from the latency of the requests (AIMD). The
+    # initial limits add up to no more than the connection pool
+    # (DB_POOL_SIZE + DB_MAX_OVERFLOW). By default a class grows up to its
+    # share of the pool, in proportion to its initial limit; a single
+    # ADMISSION_MAX_LIMIT applies to every class instead
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_LIMITS: Dict[str, int] = {
+        "read": 8,
+        "write": 3,
+        "auth": 2,
+        "stream": 2,
+    }
+    ADMISSION_TARGET_LATENCY_MS: Dict[str, float] = {
+        "read": 250,
+        "write": 500,
+        "auth": 1000,
+        "stream": 60000,
+    }
+    ADMISSION_MIN_LIMIT: int = 2
+    ADMISSION_MAX_LIMIT: Optional[int] = None
+    # requests over the limit wait in a queue, shed with a 503 when it is
+    # full or after the timeout
+    ADMISSION_QUEUE_SIZE: int = 100
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2
+    # token buckets as (requests per minute, burst), shared through Redis
+    # when RATE_LIMIT_URL is set, per worker otherwise
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_URL: Optional[str] = None
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    LOGIN_RATE_LIMIT_PER_IP: Tuple[float, int] = (30, 10)
+    LOGIN_RATE_LIMIT_PER_ACCOUNT: Tuple[float, int] = (10, 5)
+    WRITE_RATE_LIMIT_PER_IP: Tuple[float, int] = (300, 60)
+    WRITE_RATE_LIMIT_PER_ACCOUNT: Tuple[float, int] = (120, 30)
+    # post views are counted in memory per worker and written in one batch
+    # every interval, or as soon as that many views are pending
+    VIEW_COUNT_FLUSH_SECONDS: float = 10
+    VIEW_COUNT_MAX_PENDING: int = 1000
+    # bound of the distinct posts pending while the writes fail, views of
+    # other posts are dropped (and counted) beyond it
+    VIEW_COUNT_MAX_POSTS: int = 100000
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = [
         "http://localhost",
         "http://localhost:4200",
@@ -76,6 +143,68 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
 
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[str] = None
+
+    @validator("SQLALCHEMY_ASYNC_DATABASE_URI", pre=True)
+    def assemble_async_db_connection(
+        cls, value: Optional[str], values: Dict[str, Any]
+    ) -> Any:
+        """
+        Method to Assemble the asyncpg db connection, can be overridden
+        with any async url (e.g. sqlite+aiosqlite:///./test.db for tests)
+        """
+
+        if isinstance(value, str):
+            return value
+        return PostgresDsn.build(
+            scheme="postgresql+asyncpg",
+            user=values.get("POSTGRES_USER"),
+            password=values.get("POSTGRES_PASSWORD"),
+            host=values.get("POSTGRES_HOST"),
+            port=values.get("POSTGRES_PORT"),
+            path=f"/{values.get('POSTGRES_DB') or ''}",
+        )
+
+    # log files directory, created by the first record. The default is the
+    # Logs directory of the package whatever the working directory
+    LOG_DIR: str = str(Path(__file__).resolve().parents[1] / "Logs")
+    # one JSON object per record instead of the text format
+    LOG_JSON: bool = False
+    # records waiting for the writer thread, further records are dropped
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_BATCH_SIZE: int = 256
+    # fraction of the records kept per level, e.g. {"DEBUG": 0.1}
+    LOG_SAMPLE_RATES: Dict[str, float] = {}
+
+    # statements slower than this are logged
+    SLOW_QUERY_MS: float = 200
+    # a statement run this many times within a request is logged as N+1
+    N_PLUS_ONE_THRESHOLD: int = 5
+
+    # connection pool of every engine, ignored for SQLite. Bounds the useful
+    # admission limits, see ADMISSION_LIMITS
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # ping connections on checkout (pessimistic), or only detect disconnects
+    # when a statement fails (optimistic)
+    DB_POOL_PRE_PING: bool = True
+    # reuse the most recent connection first, lets idle extras time out
+    DB_POOL_USE_LIFO: bool = False
+
+    # async urls of the read replicas, as a JSON list in the environment
+    SQLALCHEMY_REPLICA_URIS: List[str] = []
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 10
+    REPLICA_CHECK_TIMEOUT_SECONDS: float = 1
+    REPLICA_MAX_LAG_SECONDS: Optional[float] = None
+    # reads of a client that wrote within this window go to the primary
+    READ_YOUR_WRITES_SECONDS: float = 5
+    READ_YOUR_WRITES_COOKIE: str = "primary_until"
+
+    # raise instead of lazy loading relationships on list reads, for tests
+    SQLALCHEMY_RAISE_ON_LAZY_LOAD: bool = False
+
     class Config:
         """
         Config class
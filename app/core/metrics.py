@@ -0,0 +1,274 @@
+"""
+    REQUEST METRICS FILE
+"""
+import bisect
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.configuration import settings
+from app.logger import logger
+
+# upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# route label of the requests no route matched, keeps the label set bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+# (method, route template)
+RouteKey = Tuple[str, str]
+
+
+class RouteMetrics:
+    """
+    Counters of one route: requests by status code, latency histogram and
+    requests in flight
+    """
+
+    __slots__ = ("statuses", "buckets", "latency_sum", "in_flight")
+
+    def __init__(self) -> None:
+        self.statuses: Dict[str, int] = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.in_flight = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "statuses": self.statuses,
+            "buckets": self.buckets,
+            "latency_sum": self.latency_sum,
+            "in_flight": self.in_flight,
+        }
+
+
+class MetricsRegistry:
+    """
+    Request metrics of this process. Only the event loop thread updates
+    them, so no locking is needed. With `METRICS_DIR` set every worker
+    periodically writes a snapshot there and `/metrics` sums the snapshots
+    of all the workers
+    """
+
+    def __init__(self, directory: Optional[str], flush_interval: float):
+        self.routes: Dict[RouteKey, RouteMetrics] = {}
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._flushed_at = time.monotonic()
+
+    def route(self, method: str, path: str) -> RouteMetrics:
+        """
+        Return the metrics of a route, creating them on first use
+        """
+        metrics = self.routes.get((method, path))
+        if metrics is None:
+            metrics = self.routes[(method, path)] = RouteMetrics()
+        return metrics
+
+    def observe(self, metrics: RouteMetrics, status_code: int, seconds: float) -> None:
+        """
+        Record a finished request
+        """
+        status = str(status_code)
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        metrics.latency_sum += seconds
+        if (
+            self.directory is not None
+            and time.monotonic() - self._flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Return the metrics of this process as JSON compatible data
+        """
+        return [
+            {"method": method, "route": route, **metrics.to_dict()}
+            for (method, route), metrics in self.routes.items()
+        ]
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(
+            str(self.directory), "metrics-" + str(os.getpid()) + ".json"
+        )
+
+    def flush(self) -> None:
+        """
+        Write the snapshot of this process to `METRICS_DIR`
+        """
+        self._flushed_at = time.monotonic()
+        if self.directory is None:
+            return
+        path = self._snapshot_path()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + ".tmp", "w") as snapshot_file:
+                json.dump(self.snapshot(), snapshot_file)
+            os.replace(path + ".tmp", path)
+        except OSError as excep:
+            logger.warning("Could not write the metrics snapshot %s: %s", path, excep)
+
+    def _worker_snapshots(self) -> Iterable[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Yield the snapshot of every worker, with whether it is still fresh.
+        This process is read from memory, the others from their files
+        """
+        yield self.snapshot(), True
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+        own = os.path.basename(self._snapshot_path())
+        stale_before = time.time() - 3 * self.flush_interval
+        for name in os.listdir(self.directory):
+            if name == own or not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                fresh = os.path.getmtime(path) >= stale_before
+                with open(path) as snapshot_file:
+                    yield json.load(snapshot_file), fresh
+            except (OSError, ValueError):
+                continue
+
+    def aggregate(self) -> Dict[RouteKey, RouteMetrics]:
+        """
+        Sum the metrics of every worker. Counters of exited workers are kept
+        so the totals never go down, their in flight gauges are not
+        """
+        total: Dict[RouteKey, RouteMetrics] = {}
+        for snapshot, fresh in self._worker_snapshots():
+            for entry in snapshot:
+                key = (entry["method"], entry["route"])
+                metrics = total.get(key)
+                if metrics is None:
+                    metrics = total[key] = RouteMetrics()
+                for status, count in entry["statuses"].items():
+                    metrics.statuses[status] = metrics.statuses.get(status, 0) + count
+                for index, count in enumerate(entry["buckets"]):
+                    metrics.buckets[index] += count
+                metrics.latency_sum += entry["latency_sum"]
+                if fresh:
+                    metrics.in_flight += entry["in_flight"]
+        return total
+
+    def render(self) -> str:
+        """
+        Render the aggregated metrics in the Prometheus text format
+        """
+        routes = sorted(self.aggregate().items())
+        lines = [
+            "# HELP http_requests_total Requests handled, by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route), metrics in routes:
+            for status, count in sorted(metrics.statuses.items()):
+                lines.append(
+                    'http_requests_total{%s,status="%s"} %d'
+                    % (_labels(method, route), status, count)
+                )
+        lines += [
+            "# HELP http_request_duration_seconds Request latency, by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), metrics in routes:
+            labels = _labels(method, route)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), metrics.buckets):
+                cumulative += count
+                lines.append(
+                    'http_request_duration_seconds_bucket{%s,le="%s"} %d'
+                    % (labels, bound, cumulative)
+                )
+            lines.append(
+                "http_request_duration_seconds_sum{%s} %r"
+                % (labels, metrics.latency_sum)
+            )
+            lines.append(
+                "http_request_duration_seconds_count{%s} %d" % (labels, cumulative)
+            )
+        lines += [
+            "# HELP http_requests_in_flight Requests being handled, by route.",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for (method, route), metrics in routes:
+            lines.append(
+                "http_requests_in_flight{%s} %d"
+                % (_labels(method, route), metrics.in_flight)
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(method: str, route: str) -> str:
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return 'method="%s",route="%s"' % (method, route)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording the metrics of every HTTP request under
+    the template of the route handling it (`/api/v1/post/{id}`) rather than
+    its raw path
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        registry: MetricsRegistry,
+        router: Router,
+        cache_size: int = 4096,
+    ):
+        self.app = app
+        self.registry = registry
+        self.router = router
+        self.cache_size = cache_size
+        self._templates: Dict[RouteKey, str] = {}
+
+    def _template(self, scope: Scope) -> str:
+        """
+        Return the template of the route matching the request, the matches
+        are cached by method and path so the route regexes only run once
+        """
+        key = (scope["method"], scope["path"])
+        template = self._templates.get(key)
+        if template is None:
+            template = UNMATCHED_ROUTE
+            for route in self.router.routes:
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    template = getattr(route, "path_format", None) or UNMATCHED_ROUTE
+                    break
+            if len(self._templates) >= self.cache_size:
+                self._templates.clear()
+            self._templates[key] = template
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.registry.route(scope["method"], self._template(scope))
+        metrics.in_flight += 1
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            self.registry.observe(metrics, status_code, time.perf_counter() - start)
+
+
+registry = MetricsRegistry(
+    settings.METRICS_DIR, flush_interval=settings.METRICS_FLUSH_SECONDS
+)
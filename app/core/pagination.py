@@ -0,0 +1,66 @@
+"""
+    KEYSET PAGINATION FILE
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional, Tuple
+
+
+class PageOrder(str, Enum):
+    """
+    Columns a page can be ordered by, `id` is always the tie breaker
+    """
+
+    ID = "id"
+    CREATED_AT = "created_at"
+
+
+@dataclass(frozen=True)
+class Pagination:
+    """
+    Decoded pagination parameters of a list request
+    """
+
+    limit: int
+    order_by: PageOrder = PageOrder.ID
+    after_value: Any = None
+    after_id: Optional[int] = None
+
+    @property
+    def is_first_page(self) -> bool:
+        """
+        Whether the request starts from the beginning of the list
+        """
+        return self.after_id is None
+
+
+def encode_cursor(order_by: PageOrder, value: Any, id_value: int) -> str:
+    """
+    Encode the sort key of the last row of a page as an opaque token
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"o": order_by.value, "v": value, "i": id_value})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: PageOrder) -> Tuple[Any, int]:
+    """
+    Decode a cursor token, raises ValueError when it is malformed or was
+    issued for another ordering
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["o"] != order_by.value:
+            raise ValueError("cursor was issued for another ordering")
+        value = payload["v"]
+        if order_by == PageOrder.CREATED_AT and value is not None:
+            value = datetime.fromisoformat(value)
+        return value, int(payload["i"])
+    except (binascii.Error, KeyError, TypeError, UnicodeDecodeError) as excep:
+        raise ValueError("invalid cursor") from excep
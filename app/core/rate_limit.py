@@ -0,0 +1,195 @@
+"""
+    RATE LIMIT FILE
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from fastapi import HTTPException
+
+from app.core.configuration import settings
+from app.exception.base_exception import too_many_requests
+
+# token bucket in Redis: refill from the elapsed time, take one token or
+# return the seconds until one is available, atomically. The time comes from
+# the Redis server, so the clocks of the workers' hosts do not matter
+TOKEN_BUCKET_SCRIPT = """
+redis.replicate_commands()
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated_at, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class LocalBucketBackend:
+    """
+    Per-worker token buckets in a bounded LRU map, O(1) per request. An
+    evicted bucket is simply full again the next time its key shows up
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """
+        Take a token from the bucket of `key`, return 0 when one was taken or
+        the seconds until the next one
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated_at) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters of the backend
+        """
+        return {
+            "backend": "local",
+            "keys": len(self._buckets),
+            "maxsize": self.maxsize,
+            "evictions": self.evictions,
+        }
+
+
+class RedisBucketBackend:
+    """
+    Token buckets shared by every worker, each bucket is a Redis hash
+    expiring once it would be full again
+    """
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as excep:
+            raise RuntimeError(
+                "RATE_LIMIT_URL is set but the redis package is not installed"
+            ) from excep
+        self._redis = aioredis.from_url(url)
+        self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """
+        Take a token from the bucket of `key`, return 0 when one was taken or
+        the seconds until the next one
+        """
+        wait = await self._script(keys=["ratelimit:" + key], args=[rate, burst])
+        return float(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters of the backend
+        """
+        return {"backend": "redis"}
+
+
+class RateLimiter:
+    """
+    Token bucket limit of `per_minute` requests per key, allowing bursts of
+    `burst` requests
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: int, backend: Any):
+        self.name = name
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.backend = backend
+        self.allowed = 0
+        self.limited = 0
+
+    async def hit(self, key: str) -> None:
+        """
+        Count a request of `key`, raise a 429 with `Retry-After` when the
+        bucket is empty
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        wait = await self.backend.take(self.name + ":" + key, self.rate, self.burst)
+        if not wait:
+            self.allowed += 1
+            return
+        self.limited += 1
+        raise HTTPException(
+            status_code=too_many_requests.status_code,
+            detail=too_many_requests.detail,
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters of the limiter
+        """
+        return {
+            "name": self.name,
+            "per_minute": self.rate * 60,
+            "burst": self.burst,
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+if settings.RATE_LIMIT_URL:
+    bucket_backend: Any = RedisBucketBackend(settings.RATE_LIMIT_URL)
+else:
+    bucket_backend = LocalBucketBackend(maxsize=settings.RATE_LIMIT_MAX_KEYS)
+
+# logins are limited per client ip and per attempted account, before the
+# user lookup and the bcrypt verify
+login_ip_limiter = RateLimiter(
+    "login-ip", *settings.LOGIN_RATE_LIMIT_PER_IP, backend=bucket_backend
+)
+login_account_limiter = RateLimiter(
+    "login-account", *settings.LOGIN_RATE_LIMIT_PER_ACCOUNT, backend=bucket_backend
+)
+# create / update / delete routes, per client ip and per authenticated user
+write_ip_limiter = RateLimiter(
+    "write-ip", *settings.WRITE_RATE_LIMIT_PER_IP, backend=bucket_backend
+)
+write_account_limiter = RateLimiter(
+    "write-account", *settings.WRITE_RATE_LIMIT_PER_ACCOUNT, backend=bucket_backend
+)
+rate_limiters = [
+    login_ip_limiter,
+    login_account_limiter,
+    write_ip_limiter,
+    write_account_limiter,
+]
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    """
+    Return the counters of every limiter and of their backend
+    """
+    return {
+        **bucket_backend.stats(),
+        "limiters": [limiter.stats() for limiter in rate_limiters],
+    }
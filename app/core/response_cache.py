@@ -0,0 +1,202 @@
+"""
+    RESPONSE CACHE FILE
+"""
+import json
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.core.cache import TTLCache
+from app.core.conditional import Validators, is_not_modified, not_modified_response
+from app.core.configuration import settings
+
+
+class LocalResponseBackend:
+    """
+    Per-worker backend, each namespace carries a generation number that is
+    part of every key so an invalidation drops the whole namespace at once
+    and the stale entries age out of the LRU
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache("response", maxsize=maxsize, ttl=ttl)
+        self._generations: Dict[str, int] = {}
+
+    async def generation(self, namespace: str) -> int:
+        """
+        Return the current generation of a namespace
+        """
+        return self._generations.get(namespace, 0)
+
+    async def get(self, namespace: str, generation: int, key: str) -> Optional[bytes]:
+        """
+        Return the body cached in a generation, or None
+        """
+        return self._cache.get((namespace, generation, key))
+
+    async def set(self, namespace: str, generation: int, key: str, body: bytes) -> None:
+        """
+        Store a body in a generation
+        """
+        self._cache.set((namespace, generation, key), body)
+
+    async def invalidate(self, namespace: str) -> None:
+        """
+        Drop every body of a namespace
+        """
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self._cache.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters of the backend
+        """
+        return self._cache.stats()
+
+
+class RedisResponseBackend:
+    """
+    Backend shared by every worker, same generation scheme as the local one
+    with the generation kept in Redis so an invalidation in one worker is
+    seen by all of them
+    """
+
+    def __init__(self, url: str, ttl: float):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as excep:
+            raise RuntimeError(
+                "RESPONSE_CACHE_URL is set but the redis package is not installed"
+            ) from excep
+        self._redis = aioredis.from_url(url)
+        self._ttl = int(ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def generation(self, namespace: str) -> int:
+        """
+        Return the current generation of a namespace
+        """
+        generation = await self._redis.get("response:" + namespace + ":generation")
+        return int(generation or 0)
+
+    def _key(self, namespace: str, generation: int, key: str) -> str:
+        return ":".join(["response", namespace, str(generation), key])
+
+    async def get(self, namespace: str, generation: int, key: str) -> Optional[bytes]:
+        """
+        Return the body cached in a generation, or None
+        """
+        body = await self._redis.get(self._key(namespace, generation, key))
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    async def set(self, namespace: str, generation: int, key: str, body: bytes) -> None:
+        """
+        Store a body in a generation
+        """
+        await self._redis.set(self._key(namespace, generation, key), body, ex=self._ttl)
+
+    async def invalidate(self, namespace: str) -> None:
+        """
+        Drop every body of a namespace
+        """
+        await self._redis.incr("response:" + namespace + ":generation")
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters of the backend
+        """
+        lookups = self.hits + self.misses
+        return {
+            "name": "response",
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+def _cache_key(request: Request) -> str:
+    """
+    Build the key of a request from its path and sorted query parameters
+    """
+    params = sorted(request.query_params.multi_items())
+    return request.url.path + "?" + "&".join(k + "=" + v for k, v in params)
+
+
+def _pack(body: bytes, validators: Validators) -> bytes:
+    """
+    Prefix a body with a JSON line holding its validators
+    """
+    last_modified = validators.last_modified
+    header = {
+        "etag": validators.etag,
+        "last_modified": last_modified.isoformat() if last_modified else None,
+    }
+    return json.dumps(header).encode() + b"\n" + body
+
+
+def _unpack(entry: bytes) -> Tuple[bytes, Validators]:
+    """
+    Split a cache entry built by `_pack`
+    """
+    header, body = entry.split(b"\n", 1)
+    values = json.loads(header)
+    last_modified = values["last_modified"]
+    return body, Validators(
+        etag=values["etag"],
+        last_modified=datetime.fromisoformat(last_modified) if last_modified else None,
+    )
+
+
+async def cached_response(
+    namespace: str,
+    request: Request,
+    build: Callable[[], Awaitable[Tuple[bytes, Validators]]],
+) -> Response:
+    """
+    Return the cached JSON body of the request, building and storing it with
+    its validators on a miss, or a 304 when the client copy is current. The
+    `X-Cache` header tells whether the cache was hit. The body is stored in
+    the generation read before building it, so a body built across an
+    invalidation is never served from the new generation
+    """
+    key = _cache_key(request)
+    generation = await response_cache.generation(namespace)
+    entry = await response_cache.get(namespace, generation, key)
+    status = "HIT"
+    if entry is None:
+        body, validators = await build()
+        await response_cache.set(namespace, generation, key, _pack(body, validators))
+        status = "MISS"
+    else:
+        body, validators = _unpack(entry)
+
+    if is_not_modified(request, validators):
+        response = not_modified_response(validators)
+    else:
+        response = Response(
+            content=body, media_type="application/json", headers=validators.headers
+        )
+    response.headers["X-Cache"] = status
+    return response
+
+
+# serialized list responses keyed by namespace ("category", "tag"), the
+# matching CRUD objects invalidate their namespace on every write
+if settings.RESPONSE_CACHE_URL:
+    response_cache: Any = RedisResponseBackend(
+        settings.RESPONSE_CACHE_URL, ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+    )
+else:
+    response_cache = LocalResponseBackend(
+        maxsize=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+    )
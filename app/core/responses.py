@@ -0,0 +1,112 @@
+"""
+    FAST JSON RESPONSE FILE
+"""
+import asyncio
+import copy
+import functools
+from typing import Any, Callable, Coroutine
+
+import orjson
+from fastapi import Request, Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, get_request_handler
+from pydantic import BaseModel, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from starlette.concurrency import run_in_threadpool
+
+
+def _default(obj: Any) -> Any:
+    """
+    Fallback of orjson for the types it does not know natively
+    """
+    if isinstance(obj, BaseModel):
+        return obj.dict(by_alias=True)
+    raise TypeError
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize content, pydantic models included, to JSON bytes with orjson
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class RenderedJSON(str):
+    """
+    JSON text already rendered by `FastJSONRoute`, `jsonable_encoder` hands
+    str instances back untouched so it reaches the response class as is
+    """
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, RenderedJSON):
+            return content.encode()
+        return dumps(content)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    Route serializing its response in a single pass when its response class
+    is `FastJSONResponse`: the returned ORM objects are validated once into
+    the response model, which orjson renders directly, skipping the
+    `jsonable_encoder` walk FastAPI does over the validated model. Headers,
+    cookies and status codes set on the injected `Response` still apply
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        response_class = self.response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        if (
+            self.secure_cloned_response_field is None
+            or not issubclass(response_class, FastJSONResponse)
+            or self.response_model_include
+            or self.response_model_exclude
+            or self.response_model_exclude_unset
+            or self.response_model_exclude_defaults
+            or self.response_model_exclude_none
+        ):
+            return super().get_route_handler()
+
+        dependant = copy.copy(self.dependant)
+        dependant.call = self._render_endpoint(self.dependant.call)
+        return get_request_handler(
+            dependant=dependant,
+            body_field=self.body_field,
+            status_code=self.status_code,
+            response_class=self.response_class,
+            response_field=None,
+            dependency_overrides_provider=self.dependency_overrides_provider,
+        )
+
+    def _render_endpoint(self, endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wrap the endpoint so it returns its result validated against the
+        response model and rendered to JSON
+        """
+        field = self.secure_cloned_response_field
+        is_coroutine = asyncio.iscoroutinefunction(endpoint)
+
+        @functools.wraps(endpoint)
+        async def render(**values: Any) -> Any:
+            if is_coroutine:
+                content = await endpoint(**values)
+            else:
+                content = await run_in_threadpool(endpoint, **values)
+            if isinstance(content, Response):
+                return content
+
+            value, errors = field.validate(content, {}, loc=("response",))
+            if errors:
+                if isinstance(errors, ErrorWrapper):
+                    errors = [errors]
+                raise ValidationError(errors, field.type_)
+            return RenderedJSON(dumps(value).decode())
+
+        return render
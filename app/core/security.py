@@ -1,17 +1,36 @@
 """
     SECURITY FILE
 """
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Optional, Tuple, Union
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.configuration import settings
+from app.exception.base_exception import password_service_busy
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ALGORITHM = "HS256"
 
 
+@functools.lru_cache()
+def get_password_context() -> CryptContext:
+    """
+    Method to create the bcrypt context on first use rather than at import.
+    Min and max rounds pin the cost so hashes made with any other cost are
+    reported by `needs_update` and rehashed on the next login
+    """
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    )
+
+
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
 ) -> str:
@@ -32,11 +51,94 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     API for Verifying password with the hash value
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
     API for Retrieving password hash
     """
-    return pwd_context.hash(password)
+    return get_password_context().hash(password)
+
+
+class PasswordService:
+    """
+    Runs bcrypt off the event loop in a dedicated, size limited thread pool
+    (bcrypt releases the GIL while hashing). Calls beyond `max_pending`
+    running or queued hashes are rejected right away with a 503 so a login
+    storm can not starve the rest of the worker
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise password_service_busy
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password"
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args
+            )
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """
+        API for Retrieving password hash
+        """
+        return await self._run(get_password_context().hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        API for Verifying password with the hash value
+        """
+        return await self._run(
+            get_password_context().verify, plain_password, hashed_password
+        )
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        API for Verifying password, also returns a new hash when the stored
+        one was made with another bcrypt cost
+        """
+        return await self._run(
+            get_password_context().verify_and_update, plain_password, hashed_password
+        )
+
+    def shutdown(self) -> None:
+        """
+        API for stopping the worker threads
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        """
+        API for getting the pool counters
+        """
+        return {
+            "name": "password",
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+
+password_service = PasswordService(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
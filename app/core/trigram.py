@@ -0,0 +1,125 @@
+"""
+    IN-PROCESS TRIGRAM INDEX FILE
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+WORD_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def trigrams(value: Optional[str]) -> Set[str]:
+    """
+    Extract the trigrams of a value the way pg_trgm does: lower case, split in
+    alphanumeric words, each word padded with two spaces in front and one
+    behind
+    """
+    grams: Set[str] = set()
+    for word in WORD_SPLIT.split((value or "").lower()):
+        if not word:
+            continue
+        padded = "  " + word + " "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    Inverted trigram index over the text fields of a set of documents, used
+    where pg_trgm is not available. Scores follow pg_trgm's word_similarity:
+    the share of the query trigrams found in the best matching field
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set[Tuple[int, str]]] = defaultdict(set)
+        self._documents: Dict[int, Dict[str, Set[str]]] = {}
+        self.ready = False
+        self.rebuilding = False
+        self.built_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: int, fields: Dict[str, Optional[str]]) -> None:
+        """
+        Index (or re-index) a document
+        """
+        with self._lock:
+            self._remove(doc_id)
+            grams = {field: trigrams(value) for field, value in fields.items()}
+            self._documents[doc_id] = grams
+            for field, field_grams in grams.items():
+                for gram in field_grams:
+                    self._postings[gram].add((doc_id, field))
+
+    def remove(self, doc_id: int) -> None:
+        """
+        Drop a document from the index
+        """
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: int) -> None:
+        for field, field_grams in self._documents.pop(doc_id, {}).items():
+            for gram in field_grams:
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard((doc_id, field))
+                    if not postings:
+                        del self._postings[gram]
+
+    def needs_rebuild(self, ttl: float) -> bool:
+        """
+        Whether the index was never built, or was built more than `ttl`
+        seconds ago and no rebuild is running
+        """
+        if not self.ready:
+            return True
+        return not self.rebuilding and time.monotonic() - self.built_at >= ttl
+
+    def rebuild(
+        self, documents: Iterable[Tuple[int, Dict[str, Optional[str]]]]
+    ) -> None:
+        """
+        Replace the whole index content. The new index is built aside and
+        swapped in, searches use the previous one meanwhile
+        """
+        postings: Dict[str, Set[Tuple[int, str]]] = defaultdict(set)
+        documents_grams: Dict[int, Dict[str, Set[str]]] = {}
+        for doc_id, fields in documents:
+            grams = {field: trigrams(value) for field, value in fields.items()}
+            documents_grams[doc_id] = grams
+            for field, field_grams in grams.items():
+                for gram in field_grams:
+                    postings[gram].add((doc_id, field))
+        with self._lock:
+            self._postings, self._documents = postings, documents_grams
+            self.built_at = time.monotonic()
+            self.ready = True
+
+    def search(
+        self, query: str, *, limit: int, threshold: float
+    ) -> List[Tuple[int, float]]:
+        """
+        Return the top `limit` (doc id, score) pairs scoring at least
+        `threshold`, best first
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        shared: Dict[Tuple[int, str], int] = defaultdict(int)
+        with self._lock:
+            for gram in query_grams:
+                for posting in self._postings.get(gram, ()):
+                    shared[posting] += 1
+
+        scores: Dict[int, float] = {}
+        for (doc_id, _field), count in shared.items():
+            score = count / len(query_grams)
+            if score >= threshold and score > scores.get(doc_id, 0.0):
+                scores[doc_id] = score
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
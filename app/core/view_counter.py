@@ -0,0 +1,150 @@
+"""
+    VIEW COUNTER FILE
+"""
+import asyncio
+import collections
+import contextvars
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app import crud
+from app.core.configuration import settings
+from app.db.session import AsyncSessionLocal
+from app.logger import logger
+
+
+class ViewCounter:
+    """
+    Write-behind post view counts: reads only bump an in-memory counter of
+    the worker, a background task writes the pending counts in one batched
+    UPSERT every `flush_interval` seconds, or as soon as `max_pending` views
+    are waiting. A failed write keeps the counts for the next flush; views
+    of new posts are dropped while `max_posts` posts are already pending
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        *,
+        flush_interval: float,
+        max_pending: int,
+        max_posts: int,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_posts = max_posts
+        self._pending: "collections.Counter[int]" = collections.Counter()
+        self._pending_views = 0
+        # created by `start()`, on the loop serving the requests
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._closing = False
+        # after a failed write, views wait for the next interval
+        self._retry_at = 0.0
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def record(self, post_id: int) -> None:
+        """
+        Count a view of a post, wake the flusher once enough views are pending
+        """
+        self.start()
+        if post_id not in self._pending and len(self._pending) >= self.max_posts:
+            self.dropped += 1
+            return
+        self._pending[post_id] += 1
+        self._pending_views += 1
+        self.recorded += 1
+        if (
+            self._pending_views >= self.max_pending
+            and time.monotonic() >= self._retry_at
+        ):
+            self._wake.set()
+
+    def start(self) -> None:
+        """
+        Start the background task on the running loop, once
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop, self._closing = loop, False
+        self._wake = asyncio.Event()
+        # in an empty context, not the one of the request starting it: the
+        # flushes must not count in its query stats or log under its id
+        self._task = contextvars.Context().run(loop.create_task, self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._closing:
+                return
+            if not await self.flush() and self._pending:
+                self._retry_at = time.monotonic() + self.flush_interval
+
+    async def flush(self) -> int:
+        """
+        Write the pending views, return the number of posts updated
+        """
+        if not self._pending:
+            return 0
+        pending, views = self._pending, self._pending_views
+        self._pending, self._pending_views = collections.Counter(), 0
+        try:
+            async with self.session_factory() as db_session:
+                updated = await crud.post.add_views_async(db_session, pending)
+        except Exception:
+            self._pending.update(pending)
+            # views recorded meanwhile may have pushed it over the bound
+            while len(self._pending) > self.max_posts:
+                self.dropped += self._pending.popitem()[1]
+            self._pending_views = sum(self._pending.values())
+            self.failures += 1
+            logger.exception("Writing %s pending post views failed", views)
+            return 0
+        self.flushes += 1
+        self.flushed += views
+        return updated
+
+    async def close(self) -> None:
+        """
+        Stop the background task and write the pending views. The task is
+        never cancelled, a write in progress is waited for
+        """
+        self._closing = True
+        task, self._task = self._task, None
+        if task is not None and self._loop is asyncio.get_running_loop():
+            self._wake.set()
+            await task
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters of the view counter
+        """
+        return {
+            "pending_views": self._pending_views,
+            "pending_posts": len(self._pending),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failures": self.failures,
+        }
+
+
+view_counter = ViewCounter(
+    AsyncSessionLocal,
+    flush_interval=settings.VIEW_COUNT_FLUSH_SECONDS,
+    max_pending=settings.VIEW_COUNT_MAX_PENDING,
+    max_posts=settings.VIEW_COUNT_MAX_POSTS,
+)
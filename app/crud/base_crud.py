@@ -1,27 +1,64 @@
 """
     BASE CRUD FILE
 """
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import String, cast, or_
+from sqlalchemy import String, and_, cast, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.inspection import inspect as sa_inspect
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
+from sqlalchemy.sql import Select
 
+from app.core.conditional import Validators, make_validators
+from app.core.configuration import settings
+from app.core.pagination import PageOrder, Pagination, encode_cursor
+from app.core.response_cache import response_cache
 from app.db.base_class import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# relationship name -> loader strategy, e.g. {"tags": "selectin"}
+Loaders = Optional[Dict[str, str]]
+
+LOADER_STRATEGIES = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "raise": raiseload,
+}
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
     CRUD CLASS - BASE CRUD
     """
 
-    def __init__(self, model: Type[ModelType]):
+    # model column backing each keyset pagination order
+    cursor_columns: Dict[PageOrder, str] = {
+        PageOrder.ID: "id",
+        PageOrder.CREATED_AT: "created_at",
+    }
+
+    # response cache namespace dropped after every async write, if any
+    cache_namespace: Optional[str] = None
+
+    def __init__(self, model: Type[ModelType], loaders: Loaders = None):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
@@ -29,8 +66,13 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
+        * `loaders`: Default loader strategy per relationship, overridable per call
         """
         self.model = model
+        self.loaders = loaders or {}
+        for strategy in self.loaders.values():
+            if strategy not in LOADER_STRATEGIES:
+                raise ValueError("Unknown loader strategy " + strategy)
 
     def get(self, db_session: Session, id_value: Any) -> Optional[ModelType]:
         """
@@ -39,37 +81,41 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return db_session.query(self.model).filter(self.model.id == id_value).first()
 
     def get_multi(
-        self, db_session: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db_session: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        loaders: Loaders = None,
     ) -> List[ModelType]:
         """
         Method to retrieve multiple objects
         """
-        return db_session.query(self.model).offset(skip).limit(limit).all()
+        return (
+            self._query(db_session, loaders, raise_on_lazy=True)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
 
-    def get_multi_without_limit(self, db_session: Session) -> List[ModelType]:
+    def get_multi_without_limit(
+        self, db_session: Session, *, loaders: Loaders = None
+    ) -> List[ModelType]:
         """
         Method to retrieve all objects without limit
         """
-        return db_session.query(self.model).all()
+        return self._query(db_session, loaders, raise_on_lazy=True).all()
 
-    def search(self, db_session: Session, keyword: str) -> Optional[list[ModelType]]:
+    def search(
+        self, db_session: Session, keyword: str, *, loaders: Loaders = None
+    ) -> Optional[list[ModelType]]:
         """
         Method to search an object
         """
 
         return (
-            db_session.query(self.model)
-            .filter(
-                or_(
-                    *[
-                        cast(self.model.__dict__[column], String).ilike(
-                            "%" + keyword + "%"
-                        )
-                        for column in sa_inspect(self.model).columns.keys()
-                        if column in self.model.__searchable__
-                    ]
-                )
-            )
+            self._query(db_session, loaders, raise_on_lazy=True)
+            .filter(self._search_filter(keyword))
             .all()
         )
 
@@ -89,19 +135,12 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_session: Session,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
     ) -> ModelType:
         """
         Method to update an object
         """
-        obj_data = jsonable_encoder(db_obj)
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        self._apply_update(db_obj, obj_in)
         db_session.add(db_obj)
         db_session.commit()
         db_session.refresh(db_obj)
@@ -115,3 +154,314 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_session.delete(obj)
         db_session.commit()
         return obj
+
+    # ------------------------------------------------------------------ #
+    # Async variants, used by the endpoints through `get_async_db`
+    # ------------------------------------------------------------------ #
+
+    def _loader_options(
+        self, loaders: Loaders = None, *, raise_on_lazy: bool = False
+    ) -> List[Any]:
+        """
+        Method to build the loader options of a query from the default
+        loaders merged with the per-call ones. List reads pass
+        `raise_on_lazy` so any relationship left lazy raises instead of
+        issuing one query per row when SQLALCHEMY_RAISE_ON_LAZY_LOAD is set
+        """
+        merged = {**self.loaders, **(loaders or {})}
+        options = [
+            LOADER_STRATEGIES[strategy](getattr(self.model, relationship))
+            for relationship, strategy in merged.items()
+        ]
+        if raise_on_lazy and settings.SQLALCHEMY_RAISE_ON_LAZY_LOAD:
+            options.append(raiseload("*"))
+        return options
+
+    def _query(
+        self, db_session: Session, loaders: Loaders = None, *, raise_on_lazy=False
+    ) -> Any:
+        """
+        Method to build the base query of the model with its loader options
+        """
+        return db_session.query(self.model).options(
+            *self._loader_options(loaders, raise_on_lazy=raise_on_lazy)
+        )
+
+    def _select(self, loaders: Loaders = None, *, raise_on_lazy=False) -> Select:
+        """
+        Method to build the base select statement of the model with its
+        loader options, lazy loading is not available on an AsyncSession
+        """
+        return select(self.model).options(
+            *self._loader_options(loaders, raise_on_lazy=raise_on_lazy)
+        )
+
+    def _search_filter(self, keyword: str) -> Any:
+        """
+        Method to build the `ILIKE` filter over the searchable columns
+        """
+        return or_(
+            *[
+                cast(self.model.__dict__[column], String).ilike("%" + keyword + "%")
+                for column in sa_inspect(self.model).columns.keys()
+                if column in self.model.__searchable__
+            ]
+        )
+
+    def _apply_update(
+        self, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> None:
+        """
+        Method to copy the update data on the column attributes of an object
+        """
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        for field in sa_inspect(self.model).columns.keys():
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+
+    async def _invalidate_cache_async(self) -> None:
+        """
+        Method to drop the cached list responses of the model after a write
+        """
+        if self.cache_namespace is not None:
+            await response_cache.invalidate(self.cache_namespace)
+
+    async def _refresh_async(
+        self, db_session: AsyncSession, db_obj: ModelType
+    ) -> ModelType:
+        """
+        Method to reload an object with the loader options of `_select`
+        """
+        result = await db_session.execute(
+            self._select()
+            .filter(self.model.id == db_obj.id)
+            .execution_options(populate_existing=True)
+        )
+        return result.unique().scalars().one()
+
+    async def get_async(
+        self, db_session: AsyncSession, id_value: Any
+    ) -> Optional[ModelType]:
+        """
+        Method to retrieve a single object by id
+        """
+        result = await db_session.execute(
+            self._select().filter(self.model.id == id_value)
+        )
+        return result.unique().scalars().first()
+
+    async def get_multi_async(
+        self,
+        db_session: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        loaders: Loaders = None,
+    ) -> List[ModelType]:
+        """
+        Method to retrieve multiple objects
+        """
+        result = await db_session.execute(
+            self._select(loaders, raise_on_lazy=True).offset(skip).limit(limit)
+        )
+        return result.unique().scalars().all()
+
+    async def get_multi_without_limit_async(
+        self, db_session: AsyncSession, *, loaders: Loaders = None
+    ) -> List[ModelType]:
+        """
+        Method to retrieve all objects without limit
+        """
+        result = await db_session.execute(self._select(loaders, raise_on_lazy=True))
+        return result.unique().scalars().all()
+
+    async def get_page_async(
+        self,
+        db_session: AsyncSession,
+        pagination: Pagination,
+        *criteria: Any,
+        loaders: Loaders = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Method to retrieve one keyset page of objects matching the criteria,
+        returns the objects and the cursor of the next page (None on the last)
+        """
+        column_name = self.cursor_columns[pagination.order_by]
+        column = getattr(self.model, column_name)
+        statement = self._select(loaders, raise_on_lazy=True).filter(*criteria)
+
+        if column_name == "id":
+            order_by = [self.model.id]
+            if not pagination.is_first_page:
+                statement = statement.filter(self.model.id > pagination.after_id)
+        else:
+            order_by = [column, self.model.id]
+            if not pagination.is_first_page:
+                statement = statement.filter(
+                    or_(
+                        column > pagination.after_value,
+                        and_(
+                            column == pagination.after_value,
+                            self.model.id > pagination.after_id,
+                        ),
+                    )
+                )
+
+        result = await db_session.execute(
+            statement.order_by(*order_by).limit(pagination.limit + 1)
+        )
+        objs = result.unique().scalars().all()
+
+        if len(objs) <= pagination.limit:
+            return objs, None
+        objs = objs[: pagination.limit]
+        last = objs[-1]
+        return objs, encode_cursor(
+            pagination.order_by, getattr(last, column_name), last.id
+        )
+
+    def _validators_select(self) -> Select:
+        """
+        Method to build the aggregate select the validators of a result are
+        derived from: its row count and latest modification time
+        """
+        return select(
+            func.count(self.model.id),
+            func.max(func.coalesce(self.model.updated_at, self.model.created_at)),
+        )
+
+    async def get_validators_async(
+        self, db_session: AsyncSession, *criteria: Any, columns: Sequence[Any] = ()
+    ) -> Validators:
+        """
+        Method to compute the ETag / Last-Modified of the objects matching the
+        criteria with one aggregate query, without loading them. `columns`
+        adds aggregates of the fields the representation also depends on
+        """
+        result = await db_session.execute(
+            self._validators_select().add_columns(*columns).filter(*criteria)
+        )
+        row = tuple(result.one())
+        modified = [value for value in row if isinstance(value, datetime)]
+        return make_validators(
+            self.model.__tablename__,
+            *row,
+            last_modified=max(modified) if modified else None,
+        )
+
+    def _validator_parts(self, obj: ModelType) -> Tuple[Any, ...]:
+        """
+        Method to list the values of an object its representation is derived
+        from: its id and creation / modification times
+        """
+        return obj.id, obj.created_at, obj.updated_at
+
+    def get_page_validators(self, objs: Sequence[ModelType], *parts: Any) -> Validators:
+        """
+        Method to compute the ETag / Last-Modified of a page from the objects
+        it returned, without another query. `parts` adds the other values the
+        representation depends on, like the next cursor
+        """
+        values = [value for obj in objs for value in self._validator_parts(obj)]
+        modified = [value for value in values if isinstance(value, datetime)]
+        return make_validators(
+            self.model.__tablename__,
+            *values,
+            *parts,
+            last_modified=max(modified) if modified else None,
+        )
+
+    async def stream_async(
+        self, db_session: AsyncSession, *, batch_size: int, loaders: Loaders = None
+    ) -> AsyncIterator[List[ModelType]]:
+        """
+        Method to iterate over every object in id order, in batches read from
+        a server-side cursor so memory stays flat whatever the table size
+        """
+        result = await db_session.stream(
+            self._select(loaders, raise_on_lazy=True)
+            .order_by(self.model.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for batch in result.scalars().partitions(batch_size):
+            yield batch
+
+    async def search_async(
+        self, db_session: AsyncSession, keyword: str, *, loaders: Loaders = None
+    ) -> Optional[list[ModelType]]:
+        """
+        Method to search an object
+        """
+        result = await db_session.execute(
+            self._select(loaders, raise_on_lazy=True).filter(
+                self._search_filter(keyword)
+            )
+        )
+        return result.unique().scalars().all()
+
+    async def create_async(
+        self, db_session: AsyncSession, *, obj_in: CreateSchemaType
+    ) -> ModelType:
+        """
+        Method to Create a new object
+        """
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)  # type: ignore
+        db_session.add(db_obj)
+        await db_session.commit()
+        await self._invalidate_cache_async()
+        return await self._refresh_async(db_session, db_obj)
+
+    async def _insert_many_async(
+        self, db_session: AsyncSession, rows: List[Dict[str, Any]], *, key: str
+    ) -> Dict[Any, int]:
+        """
+        Method to insert rows with a single multi-row INSERT, returns the new
+        ids by value of the unique `key` column. Uses RETURNING where the
+        dialect supports it, otherwise reads the ids back in one query
+        """
+        key_column = getattr(self.model, key)
+        statement = insert(self.model).values(rows)
+        if db_session.bind.dialect.full_returning:
+            result = await db_session.execute(
+                statement.returning(self.model.id, key_column)
+            )
+        else:
+            await db_session.execute(statement)
+            result = await db_session.execute(
+                select(self.model.id, key_column).filter(
+                    key_column.in_([row[key] for row in rows])
+                )
+            )
+        return {value: id_value for id_value, value in result.all()}
+
+    async def update_async(
+        self,
+        db_session: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+    ) -> ModelType:
+        """
+        Method to update an object
+        """
+        self._apply_update(db_obj, obj_in)
+        db_session.add(db_obj)
+        await db_session.commit()
+        await self._invalidate_cache_async()
+        return await self._refresh_async(db_session, db_obj)
+
+    async def remove_async(
+        self, db_session: AsyncSession, *, id_value: int
+    ) -> ModelType:
+        """
+        Method to Remove an object
+        """
+        obj = await self.get_async(db_session, id_value)
+        await db_session.delete(obj)
+        await db_session.commit()
+        await self._invalidate_cache_async()
+        return obj
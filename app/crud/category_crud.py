@@ -3,6 +3,7 @@
 """
 import logging
 from typing import Any, Dict, Optional, Union, List
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.security import get_password_hash, verify_password
@@ -19,6 +20,8 @@ class CRUDCategory(CRUDBase[Category, CategoryCreate, CategoryUpdate]):
     CRUD CLASS - CATEGORY
     """
 
+    cache_namespace = "category"
+
     def create(self, db_session: Session, *, obj_in: CategoryCreate) -> Category:
         """
         Method to Create a new category object
@@ -32,5 +35,20 @@ class CRUDCategory(CRUDBase[Category, CategoryCreate, CategoryUpdate]):
         db_session.refresh(db_obj)
         return db_obj
 
+    async def create_async(
+        self, db_session: AsyncSession, *, obj_in: CategoryCreate
+    ) -> Category:
+        """
+        Method to Create a new category object
+        """
+        db_obj = Category(
+            name=obj_in.name,
+            description=obj_in.description,
+        )
+        db_session.add(db_obj)
+        await db_session.commit()
+        await self._invalidate_cache_async()
+        return await self._refresh_async(db_session, db_obj)
+
 
 category = CRUDCategory(Category)
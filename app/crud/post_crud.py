@@ -1,18 +1,59 @@
 """
     CRUD TAG FILE
 """
+import html
 import logging
-from typing import Any, Dict, Optional, Union, List
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Union, List, Tuple
+from sqlalchemy import bindparam, delete, func, insert, literal_column, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
 
+from app.core.pagination import Pagination
 from app.core.security import get_password_hash, verify_password
-from app.crud.base_crud import CRUDBase
-from app.models import Post, Tag
+from app.crud.base_crud import CRUDBase, Loaders
+from app.crud.category_crud import category
+from app.crud.tag_crud import tag
+from app.models import Category, Post, Tag, User, post_tag, post_view
 from app.schemas import PostCreate, PostUpdate, PostDisplay
 
 # get root logger
 logger = logging.getLogger(__name__)
 
+# (category id, author id, tag ids) of a post, the keys its counters live under
+CountKeys = Tuple[Optional[int], Optional[int], Iterable[int]]
+# model -> id -> post count change
+CountDeltas = Dict[Any, Counter]
+
+# dialect specific INSERT constructs, both support ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+SEARCH_LANGUAGE = "english"
+SNIPPET_START, SNIPPET_STOP = "<mark>", "</mark>"
+# the database delimits the matches with private use characters, they only
+# become <mark> tags once the rest of the snippet is HTML escaped
+HIGHLIGHT_START, HIGHLIGHT_STOP = "\ue000", "\ue001"
+HEADLINE_OPTIONS = (
+    f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords=35, MinWords=15"
+)
+
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """
+    Method to HTML escape a search snippet, keeping only the highlights as
+    <mark> tags
+    """
+    if snippet is None:
+        return None
+    return (
+        html.escape(snippet)
+        .replace(HIGHLIGHT_START, SNIPPET_START)
+        .replace(HIGHLIGHT_STOP, SNIPPET_STOP)
+    )
+
 
 class CRUDCategory(CRUDBase[Post, PostCreate, PostUpdate]):
     """
@@ -36,28 +77,584 @@ class CRUDCategory(CRUDBase[Post, PostCreate, PostUpdate]):
         return db_obj
 
     def get_multi_by_user(
-        self, db_session: Session, *, user_id: int
+        self, db_session: Session, *, user_id: int, loaders: Loaders = None
     ) -> List[PostDisplay]:
         """
         Method to get all objects by user id
         """
-        return db_session.query(Post).filter(Post.author_id == user_id).all()
+        return (
+            self._query(db_session, loaders, raise_on_lazy=True)
+            .filter(Post.author_id == user_id)
+            .all()
+        )
 
     def get_multi_by_category(
-        self, db_session: Session, *, category_id: int
+        self, db_session: Session, *, category_id: int, loaders: Loaders = None
     ) -> List[PostDisplay]:
         """
         Method to get all objects by category id
         """
-        return db_session.query(Post).filter(Post.category_id == category_id).all()
+        return (
+            self._query(db_session, loaders, raise_on_lazy=True)
+            .filter(Post.category_id == category_id)
+            .all()
+        )
 
     def get_multi_by_tag(
-        self, db_session: Session, *, tag_id: int
+        self, db_session: Session, *, tag_id: int, loaders: Loaders = None
     ) -> List[PostDisplay]:
         """
         Method to get all objects by tag id
         """
-        return db_session.query(Post).filter(Post.tags.any(id=tag_id)).all()
+        return (
+            self._query(db_session, loaders, raise_on_lazy=True)
+            .filter(Post.tags.any(id=tag_id))
+            .all()
+        )
+
+    async def _get_tags_async(
+        self, db_session: AsyncSession, tag_ids: List[int]
+    ) -> List[Tag]:
+        """
+        Method to get the tag objects for a list of tag ids
+        """
+        if not tag_ids:
+            return []
+        result = await db_session.execute(select(Tag).filter(Tag.id.in_(tag_ids)))
+        return result.scalars().all()
+
+    @staticmethod
+    def count_deltas(
+        posts: Iterable[CountKeys], sign: int, deltas: Optional[CountDeltas] = None
+    ) -> CountDeltas:
+        """
+        Method to add the counter changes of posts appearing (sign 1) or
+        going away (sign -1), old and new keys of an update cancel out
+        """
+        if deltas is None:
+            deltas = {Category: Counter(), User: Counter(), Tag: Counter()}
+        for category_id, author_id, tag_ids in posts:
+            if category_id is not None:
+                deltas[Category][category_id] += sign
+            if author_id is not None:
+                deltas[User][author_id] += sign
+            for tag_id in tag_ids:
+                deltas[Tag][tag_id] += sign
+        return deltas
+
+    async def _apply_count_deltas_async(
+        self, db_session: AsyncSession, deltas: CountDeltas
+    ) -> None:
+        """
+        Method to shift the post counters inside the current transaction,
+        one executemany UPDATE per table. Rows are updated in id order so
+        concurrent writers lock them in the same order
+        """
+        for model, counter in deltas.items():
+            params = [
+                {"counted_id": id_value, "delta": delta}
+                for id_value, delta in sorted(counter.items())
+                if delta
+            ]
+            if not params:
+                continue
+            table = model.__table__
+            await db_session.execute(
+                table.update()
+                .where(table.c.id == bindparam("counted_id"))
+                .values(post_count=table.c.post_count + bindparam("delta")),
+                params,
+            )
+
+    async def _invalidate_counts_async(self, deltas: CountDeltas) -> None:
+        """
+        Method to drop the cached category / tag lists, which carry the
+        counters, once the counter changes are committed
+        """
+        if any(deltas[Category].values()):
+            await category._invalidate_cache_async()
+        if any(deltas[Tag].values()):
+            await tag._invalidate_cache_async()
+
+    async def apply_counts_async(
+        self, db_session: AsyncSession, deltas: CountDeltas
+    ) -> None:
+        """
+        Method to commit the counter changes of posts written without this
+        CRUD (bulk loads), built with `count_deltas`
+        """
+        await self._apply_count_deltas_async(db_session, deltas)
+        await db_session.commit()
+        await self._invalidate_counts_async(deltas)
+
+    async def add_views_async(
+        self, db_session: AsyncSession, views: Dict[int, int]
+    ) -> int:
+        """
+        Method to add view counts to posts in one executemany UPSERT and
+        commit. Views of posts deleted in the meantime are dropped. Returns
+        the number of posts updated
+        """
+        result = await db_session.execute(
+            select(Post.id).filter(Post.id.in_(list(views)))
+        )
+        existing = set(result.scalars().all())
+        # rows in id order so concurrent flushes lock them in the same order
+        params = [
+            {"post_id": id_value, "views": views[id_value]}
+            for id_value in sorted(existing)
+            if views[id_value]
+        ]
+        if not params:
+            return 0
+        upsert = UPSERT_INSERTS[db_session.bind.dialect.name](post_view)
+        await db_session.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[post_view.c.post_id],
+                set_={"views": post_view.c.views + upsert.excluded.views},
+            ),
+            params,
+        )
+        await db_session.commit()
+        return len(params)
+
+    async def create_async(
+        self, db_session: AsyncSession, *, obj_in: PostCreate
+    ) -> Post:
+        """
+        Method to create a new object
+        """
+        db_obj = Post(
+            title=obj_in.title,
+            body=obj_in.body,
+            category_id=obj_in.category_id,
+            author_id=obj_in.author_id,
+            tags=await self._get_tags_async(db_session, obj_in.tags),
+        )
+        deltas = self.count_deltas(
+            [(db_obj.category_id, db_obj.author_id, [t.id for t in db_obj.tags])], 1
+        )
+        db_session.add(db_obj)
+        await self._apply_count_deltas_async(db_session, deltas)
+        await db_session.commit()
+        await self._invalidate_counts_async(deltas)
+        return await self._refresh_async(db_session, db_obj)
+
+    async def create_many_async(
+        self, db_session: AsyncSession, *, objs_in: List[PostCreate]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Method to create many objects in a fixed number of round trips: one
+        query each for the referenced tags, categories, authors and titles,
+        one multi-row INSERT for the posts, one executemany INSERT for the
+        post_tag rows, one read of the shifted tag counters and a single
+        commit. Returns the created rows and the errors of the rejected items
+        """
+        tag_ids = {tag_id for obj_in in objs_in for tag_id in obj_in.tags}
+        result = await db_session.execute(select(Tag).filter(Tag.id.in_(tag_ids)))
+        tags = {tag.id: tag for tag in result.scalars().all()}
+        result = await db_session.execute(
+            select(Category.id).filter(
+                Category.id.in_({obj_in.category_id for obj_in in objs_in})
+            )
+        )
+        category_ids = set(result.scalars().all())
+        result = await db_session.execute(
+            select(User.id).filter(
+                User.id.in_({obj_in.author_id for obj_in in objs_in})
+            )
+        )
+        author_ids = set(result.scalars().all())
+        result = await db_session.execute(
+            select(Post.title).filter(
+                Post.title.in_({obj_in.title for obj_in in objs_in})
+            )
+        )
+        taken = set(result.scalars().all())
+
+        errors, rows, item_tags = [], [], {}
+        for index, obj_in in enumerate(objs_in):
+            missing_tags = [tag_id for tag_id in obj_in.tags if tag_id not in tags]
+            if obj_in.title in taken:
+                detail = "Post title already exists"
+            elif obj_in.category_id not in category_ids:
+                detail = "Category Does Not Exist!"
+            elif obj_in.author_id not in author_ids:
+                detail = "User Does Not Exist!"
+            elif missing_tags:
+                detail = "Tag Does Not Exist: " + ", ".join(map(str, missing_tags))
+            else:
+                detail = None
+            if detail:
+                errors.append({"index": index, "detail": detail})
+                continue
+            taken.add(obj_in.title)
+            rows.append(
+                {
+                    "title": obj_in.title,
+                    "body": obj_in.body,
+                    "category_id": obj_in.category_id,
+                    "author_id": obj_in.author_id,
+                }
+            )
+            item_tags[obj_in.title] = list(dict.fromkeys(obj_in.tags))
+        if not rows:
+            return [], errors
+
+        ids = await self._insert_many_async(db_session, rows, key="title")
+        links = [
+            {"post_id": ids[row["title"]], "tag_id": tag_id}
+            for row in rows
+            for tag_id in item_tags[row["title"]]
+        ]
+        if links:
+            await db_session.execute(insert(post_tag), links)
+        deltas = self.count_deltas(
+            (
+                (row["category_id"], row["author_id"], item_tags[row["title"]])
+                for row in rows
+            ),
+            1,
+        )
+        await self._apply_count_deltas_async(db_session, deltas)
+        # the loaded tags predate the counter UPDATE, read the new counts
+        result = await db_session.execute(
+            select(Tag.id, Tag.post_count).filter(Tag.id.in_(list(deltas[Tag])))
+        )
+        post_counts = dict(result.all())
+        await db_session.commit()
+        await self._invalidate_counts_async(deltas)
+
+        created = [
+            {
+                "id": ids[row["title"]],
+                **row,
+                "tags": [
+                    {
+                        "id": tag_id,
+                        "name": tags[tag_id].name,
+                        "post_count": post_counts[tag_id],
+                    }
+                    for tag_id in item_tags[row["title"]]
+                ],
+            }
+            for row in rows
+        ]
+        return created, errors
+
+    async def update_async(
+        self,
+        db_session: AsyncSession,
+        *,
+        db_obj: Post,
+        obj_in: Union[PostUpdate, Dict[str, Any]],
+    ) -> Post:
+        """
+        Method to update an object, tag ids are resolved to tag objects
+        """
+        if isinstance(obj_in, dict):
+            update_data = dict(obj_in)
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        deltas = self.count_deltas(
+            [(db_obj.category_id, db_obj.author_id, [t.id for t in db_obj.tags])], -1
+        )
+        if "tags" in update_data:
+            db_obj.tags = await self._get_tags_async(
+                db_session, update_data.pop("tags")
+            )
+            # the post row itself may be untouched, bump it for the validators
+            update_data["updated_at"] = func.now()
+        new_keys = (
+            update_data.get("category_id", db_obj.category_id),
+            update_data.get("author_id", db_obj.author_id),
+            [t.id for t in db_obj.tags],
+        )
+        self.count_deltas([new_keys], 1, deltas)
+        await self._apply_count_deltas_async(db_session, deltas)
+        db_obj = await super().update_async(
+            db_session, db_obj=db_obj, obj_in=update_data
+        )
+        await self._invalidate_counts_async(deltas)
+        return db_obj
+
+    async def remove_async(self, db_session: AsyncSession, *, id_value: int) -> Post:
+        """
+        Method to Remove an object along with its share of the post counters
+        """
+        obj = await self.get_async(db_session, id_value)
+        deltas = self.count_deltas(
+            [(obj.category_id, obj.author_id, [t.id for t in obj.tags])], -1
+        )
+        await self._apply_count_deltas_async(db_session, deltas)
+        # not left to the cascade, SQLite does not enforce foreign keys
+        await db_session.execute(
+            delete(post_view).where(post_view.c.post_id == id_value)
+        )
+        await db_session.delete(obj)
+        await db_session.commit()
+        await self._invalidate_counts_async(deltas)
+        return obj
+
+    async def reconcile_counts_async(self, db_session: AsyncSession) -> Dict[str, int]:
+        """
+        Method to recompute every post counter from the post and post_tag
+        tables in bulk, one UPDATE per table touching only the rows that
+        drifted (sync code paths, cascades, manual SQL). Returns the number
+        of corrected rows per table
+        """
+        post_table = Post.__table__
+        category_table = Category.__table__
+        user_table = User.__table__
+        tag_table = Tag.__table__
+        counts = [
+            (
+                category_table,
+                select(func.count(post_table.c.id)).where(
+                    post_table.c.category_id == category_table.c.id
+                ),
+            ),
+            (
+                user_table,
+                select(func.count(post_table.c.id)).where(
+                    post_table.c.author_id == user_table.c.id
+                ),
+            ),
+            (
+                tag_table,
+                select(func.count(post_tag.c.post_id)).where(
+                    post_tag.c.tag_id == tag_table.c.id
+                ),
+            ),
+        ]
+        corrected = {}
+        for table, count in counts:
+            counted = count.scalar_subquery()
+            result = await db_session.execute(
+                table.update()
+                .where(table.c.post_count != counted)
+                .values(post_count=counted)
+            )
+            corrected[table.name] = result.rowcount
+        await db_session.commit()
+        await category._invalidate_cache_async()
+        await tag._invalidate_cache_async()
+        return corrected
+
+    async def get_count_stats_async(
+        self, db_session: AsyncSession, *, limit: int
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Method to read the categories, tags and authors with the most posts
+        from their counters
+        """
+        stats = {}
+        for key, model, name in (
+            ("categories", Category, Category.name),
+            ("tags", Tag, Tag.name),
+            ("authors", User, User.username),
+        ):
+            result = await db_session.execute(
+                select(model.id, name.label("name"), model.post_count)
+                .order_by(model.post_count.desc(), model.id)
+                .limit(limit)
+            )
+            stats[key] = [dict(row._mapping) for row in result]
+        return stats
+
+    def _validator_parts(self, obj: Post) -> Tuple[Any, ...]:
+        """
+        Method to list the values of a post its representation is derived
+        from, its tags and view count included
+        """
+        return (
+            *super()._validator_parts(obj),
+            obj.views,
+            *[
+                value
+                for tag in obj.tags
+                for value in (tag.id, tag.post_count, tag.created_at, tag.updated_at)
+            ],
+        )
+
+    def _validators_select(self) -> Select:
+        """
+        Method to build the aggregate select of the validators, tags are part
+        of the post representation so their links and modification times
+        count too
+        """
+        return (
+            select(
+                func.count(Post.id.distinct()),
+                func.count(Tag.id),
+                func.max(func.coalesce(Post.updated_at, Post.created_at)),
+                func.max(func.coalesce(Tag.updated_at, Tag.created_at)),
+            )
+            .select_from(Post)
+            .outerjoin(post_tag, post_tag.c.post_id == Post.id)
+            .outerjoin(Tag, Tag.id == post_tag.c.tag_id)
+        )
+
+    async def get_multi_by_user_async(
+        self, db_session: AsyncSession, *, user_id: int, loaders: Loaders = None
+    ) -> List[Post]:
+        """
+        Method to get all objects by user id
+        """
+        result = await db_session.execute(
+            self._select(loaders, raise_on_lazy=True).filter(Post.author_id == user_id)
+        )
+        return result.unique().scalars().all()
+
+    async def get_multi_by_category_async(
+        self, db_session: AsyncSession, *, category_id: int, loaders: Loaders = None
+    ) -> List[Post]:
+        """
+        Method to get all objects by category id
+        """
+        result = await db_session.execute(
+            self._select(loaders, raise_on_lazy=True).filter(
+                Post.category_id == category_id
+            )
+        )
+        return result.unique().scalars().all()
+
+    async def get_multi_by_tag_async(
+        self, db_session: AsyncSession, *, tag_id: int, loaders: Loaders = None
+    ) -> List[Post]:
+        """
+        Method to get all objects by tag id
+        """
+        result = await db_session.execute(
+            self._select(loaders, raise_on_lazy=True).filter(Post.tags.any(id=tag_id))
+        )
+        return result.unique().scalars().all()
+
+    async def get_page_by_user_async(
+        self,
+        db_session: AsyncSession,
+        *,
+        user_id: int,
+        pagination: Pagination,
+        loaders: Loaders = None,
+    ) -> Tuple[List[Post], Optional[str]]:
+        """
+        Method to get one page of objects by user id
+        """
+        return await self.get_page_async(
+            db_session, pagination, Post.author_id == user_id, loaders=loaders
+        )
+
+    async def get_page_by_category_async(
+        self,
+        db_session: AsyncSession,
+        *,
+        category_id: int,
+        pagination: Pagination,
+        loaders: Loaders = None,
+    ) -> Tuple[List[Post], Optional[str]]:
+        """
+        Method to get one page of objects by category id
+        """
+        return await self.get_page_async(
+            db_session, pagination, Post.category_id == category_id, loaders=loaders
+        )
+
+    async def get_page_by_tag_async(
+        self,
+        db_session: AsyncSession,
+        *,
+        tag_id: int,
+        pagination: Pagination,
+        loaders: Loaders = None,
+    ) -> Tuple[List[Post], Optional[str]]:
+        """
+        Method to get one page of objects by tag id
+        """
+        return await self.get_page_async(
+            db_session, pagination, Post.tags.any(id=tag_id), loaders=loaders
+        )
+
+    async def search_ranked_async(
+        self,
+        db_session: AsyncSession,
+        *,
+        keyword: str,
+        limit: int,
+        offset: int = 0,
+        loaders: Loaders = None,
+    ) -> List[Tuple[Post, float, Optional[str]]]:
+        """
+        Method to run a ranked full text search over title and body, returns
+        (post, rank, HTML escaped body snippet) tuples, best match first
+        """
+        if db_session.bind.dialect.name == "sqlite":
+            hits = await self._search_hits_fts5(db_session, keyword, limit, offset)
+        else:
+            hits = await self._search_hits_tsvector(db_session, keyword, limit, offset)
+        if not hits:
+            return []
+
+        result = await db_session.execute(
+            self._select(loaders, raise_on_lazy=True).filter(
+                Post.id.in_([hit[0] for hit in hits])
+            )
+        )
+        posts = {post.id: post for post in result.unique().scalars().all()}
+        return [
+            (posts[post_id], rank, highlight(snippet))
+            for post_id, rank, snippet in hits
+            if post_id in posts
+        ]
+
+    async def _search_hits_tsvector(
+        self, db_session: AsyncSession, keyword: str, limit: int, offset: int
+    ) -> List[Tuple[int, float, Optional[str]]]:
+        """
+        Method to rank matches with the GIN indexed `post.search_vector`
+        """
+        tsquery = func.websearch_to_tsquery(SEARCH_LANGUAGE, keyword)
+        vector = literal_column("post.search_vector")
+        rank = func.ts_rank_cd(vector, tsquery)
+        snippet = func.ts_headline(
+            SEARCH_LANGUAGE, Post.body, tsquery, HEADLINE_OPTIONS
+        )
+        result = await db_session.execute(
+            select(Post.id, rank, snippet)
+            .where(vector.op("@@")(tsquery))
+            .order_by(rank.desc(), Post.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def _search_hits_fts5(
+        self, db_session: AsyncSession, keyword: str, limit: int, offset: int
+    ) -> List[Tuple[int, float, Optional[str]]]:
+        """
+        Method to rank matches with the `post_fts` FTS5 table (SQLite)
+        """
+        # quote every word so user input can not use the FTS5 query syntax
+        terms = re.findall(r"\w+", keyword)
+        if not terms:
+            return []
+        result = await db_session.execute(
+            text(
+                "SELECT rowid, -bm25(post_fts, 10.0, 1.0) AS rank, "
+                "snippet(post_fts, 1, :start, :stop, '...', 16) "
+                "FROM post_fts WHERE post_fts MATCH :query "
+                "ORDER BY rank DESC, rowid LIMIT :limit OFFSET :offset"
+            ),
+            {
+                "query": " ".join('"' + term + '"' for term in terms),
+                "start": HIGHLIGHT_START,
+                "stop": HIGHLIGHT_STOP,
+                "limit": limit,
+                "offset": offset,
+            },
+        )
+        return [tuple(row) for row in result.all()]
 
 
-post = CRUDCategory(Post)
+# tags are serialized with every post, load them in one extra query per page
+post = CRUDCategory(Post, loaders={"tags": "selectin"})
@@ -2,7 +2,9 @@
     CRUD TAG FILE
 """
 import logging
-from typing import Any, Dict, Optional, Union, List
+from typing import Any, Dict, Optional, Union, List, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.security import get_password_hash, verify_password
@@ -19,6 +21,8 @@ class CRUDCategory(CRUDBase[Tag, TagCreate, TagUpdate]):
     CRUD CLASS - TAG
     """
 
+    cache_namespace = "tag"
+
     def create(self, db_session: Session, *, obj_in: TagCreate) -> Tag:
         """
         Method to Create a new tag object
@@ -32,5 +36,46 @@ class CRUDCategory(CRUDBase[Tag, TagCreate, TagUpdate]):
         db_session.refresh(db_obj)
         return db_obj
 
+    async def create_async(self, db_session: AsyncSession, *, obj_in: TagCreate) -> Tag:
+        """
+        Method to Create a new tag object
+        """
+        db_obj = Tag(
+            name=obj_in.name,
+            description=obj_in.description,
+        )
+        db_session.add(db_obj)
+        await db_session.commit()
+        await self._invalidate_cache_async()
+        return await self._refresh_async(db_session, db_obj)
+
+    async def create_many_async(
+        self, db_session: AsyncSession, *, objs_in: List[TagCreate]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Method to Create many tag objects with one INSERT and one commit,
+        returns the created rows and the errors of the rejected items
+        """
+        errors = []
+        result = await db_session.execute(
+            select(Tag.name).filter(Tag.name.in_({obj_in.name for obj_in in objs_in}))
+        )
+        taken = set(result.scalars().all())
+
+        rows = []
+        for index, obj_in in enumerate(objs_in):
+            if obj_in.name in taken:
+                errors.append({"index": index, "detail": "Tag name already exists"})
+                continue
+            taken.add(obj_in.name)
+            rows.append({"name": obj_in.name, "description": obj_in.description})
+        if not rows:
+            return [], errors
+
+        ids = await self._insert_many_async(db_session, rows, key="name")
+        await db_session.commit()
+        await self._invalidate_cache_async()
+        return [{"id": ids[row["name"]], **row} for row in rows], errors
+
 
 tag = CRUDCategory(Tag)
@@ -1,11 +1,18 @@
 """
     CRUD USER FILE
 """
+import asyncio
 import logging
-from typing import Any, Dict, Optional, Union, List
+from typing import Any, Dict, Optional, Union, List, Tuple
+from sqlalchemy import func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import user_cache
+from app.core.configuration import settings
+from app.core.pagination import PageOrder
+from app.core.security import get_password_hash, password_service, verify_password
+from app.core.trigram import TrigramIndex
 from app.crud.base_crud import CRUDBase
 from app.models.user_models import User
 from app.schemas.user_schema import UserCreate, UserUpdate, UserDisplay
@@ -13,12 +20,31 @@ from app.schemas.user_schema import UserCreate, UserUpdate, UserDisplay
 # get root logger
 logger = logging.getLogger(__name__)
 
+DIRECTORY_FIELDS = ("first_name", "last_name", "email", "username")
+
+# fallback for databases without pg_trgm, built by the first search. Each
+# worker keeps its own copy: writes of the worker update it right away, the
+# others' show up when it is rebuilt, every USER_SEARCH_INDEX_TTL_SECONDS
+user_search_index = TrigramIndex()
+
+
+def index_user(user: User) -> None:
+    """
+    Keep the in-process directory index in sync with a written user
+    """
+    if user_search_index.ready:
+        user_search_index.add(
+            user.id, {field: getattr(user, field) for field in DIRECTORY_FIELDS}
+        )
+
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     """
     CRUD CLASS - USER
     """
 
+    cursor_columns = {PageOrder.ID: "id", PageOrder.CREATED_AT: "created"}
+
     def get_by_email(self, db_session: Session, *, email: str) -> Optional[User]:
         """
         Method to retrieve user by email
@@ -47,6 +73,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db_session.add(db_obj)
         db_session.commit()
         db_session.refresh(db_obj)
+        index_user(db_obj)
         return db_obj
 
     def update(
@@ -64,10 +91,22 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         else:
             update_data = obj_in.dict(exclude_unset=True)
         if "password" in update_data and update_data["password"]:
-            hashed_password = get_password_hash(update_data["password"])
-            del update_data["password"]
-            update_data["hashed_password"] = hashed_password
-        return super().update(db_session, db_obj=db_obj, obj_in=update_data)
+            update_data["password"] = get_password_hash(update_data["password"])
+        else:
+            update_data.pop("password", None)
+        db_obj = super().update(db_session, db_obj=db_obj, obj_in=update_data)
+        user_cache.invalidate(db_obj.id)
+        index_user(db_obj)
+        return db_obj
+
+    def remove(self, db_session: Session, *, id_value: int) -> User:
+        """
+        Method to Remove a user object
+        """
+        obj = super().remove(db_session, id_value=id_value)
+        user_cache.invalidate(id_value)
+        user_search_index.remove(id_value)
+        return obj
 
     def authenticate(
         self, db_session: Session, *, email: str, password: str
@@ -82,6 +121,176 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             return None
         return user_exist
 
+    async def get_by_email_async(
+        self, db_session: AsyncSession, *, email: str
+    ) -> Optional[User]:
+        """
+        Method to retrieve user by email
+        """
+        result = await db_session.execute(select(User).filter(User.email == email))
+        return result.scalars().first()
+
+    async def get_by_id_async(
+        self, db_session: AsyncSession, *, id_value: int
+    ) -> Optional[User]:
+        """
+        Method to retrieve user by id
+        """
+        return await self.get_async(db_session, id_value)
+
+    async def create_async(
+        self, db_session: AsyncSession, *, obj_in: UserCreate
+    ) -> User:
+        """
+        Method to Create a new user object
+        """
+        db_obj = User(
+            first_name=obj_in.first_name,
+            last_name=obj_in.last_name,
+            email=obj_in.email,
+            password=await password_service.hash(obj_in.password),
+            is_admin=obj_in.is_admin,
+            username=obj_in.username,
+            gender=obj_in.gender,
+        )
+        db_session.add(db_obj)
+        await db_session.commit()
+        db_obj = await self._refresh_async(db_session, db_obj)
+        index_user(db_obj)
+        return db_obj
+
+    async def update_async(
+        self,
+        db_session: AsyncSession,
+        *,
+        db_obj: User,
+        obj_in: Union[UserUpdate, Dict[str, Any]]
+    ) -> User:
+        """
+        Method to Update a user object
+        """
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        if "password" in update_data and update_data["password"]:
+            update_data["password"] = await password_service.hash(
+                update_data["password"]
+            )
+        else:
+            update_data.pop("password", None)
+        db_obj = await super().update_async(
+            db_session, db_obj=db_obj, obj_in=update_data
+        )
+        user_cache.invalidate(db_obj.id)
+        index_user(db_obj)
+        return db_obj
+
+    async def remove_async(self, db_session: AsyncSession, *, id_value: int) -> User:
+        """
+        Method to Remove a user object
+        """
+        obj = await super().remove_async(db_session, id_value=id_value)
+        user_cache.invalidate(id_value)
+        user_search_index.remove(id_value)
+        return obj
+
+    async def search_directory_async(
+        self, db_session: AsyncSession, *, keyword: str, limit: int
+    ) -> List[Tuple[User, float]]:
+        """
+        Method to search the user directory by trigram similarity over the
+        names, email and username, returns the top `limit` (user, score)
+        pairs, best first. Tolerates typos and partial input
+        """
+        if db_session.bind.dialect.name == "postgresql":
+            return await self._search_directory_pg_trgm(db_session, keyword, limit)
+        return await self._search_directory_index(db_session, keyword, limit)
+
+    async def _search_directory_pg_trgm(
+        self, db_session: AsyncSession, keyword: str, limit: int
+    ) -> List[Tuple[User, float]]:
+        """
+        Method to rank users with pg_trgm, the `<%` operator uses the trigram
+        GIN indexes of the directory columns
+        """
+        await db_session.execute(
+            select(
+                func.set_config(
+                    "pg_trgm.word_similarity_threshold",
+                    str(settings.USER_SEARCH_THRESHOLD),
+                    True,
+                )
+            )
+        )
+        columns = [getattr(User, field) for field in DIRECTORY_FIELDS]
+        score = func.greatest(
+            *[func.word_similarity(keyword, column) for column in columns]
+        ).label("score")
+        result = await db_session.execute(
+            select(User, score)
+            .where(or_(*[literal(keyword).op("<%")(column) for column in columns]))
+            .order_by(score.desc(), User.id)
+            .limit(limit)
+        )
+        return [(user, user_score) for user, user_score in result.all()]
+
+    async def _search_directory_index(
+        self, db_session: AsyncSession, keyword: str, limit: int
+    ) -> List[Tuple[User, float]]:
+        """
+        Method to rank users with the in-process trigram index, rebuilt from
+        the table once expired. The trigrams are computed in a thread, off
+        the event loop
+        """
+        if user_search_index.needs_rebuild(settings.USER_SEARCH_INDEX_TTL_SECONDS):
+            user_search_index.rebuilding = True
+            try:
+                result = await db_session.execute(
+                    select(
+                        User.id, *[getattr(User, field) for field in DIRECTORY_FIELDS]
+                    )
+                )
+                rows = result.all()
+                await asyncio.get_running_loop().run_in_executor(
+                    None,
+                    user_search_index.rebuild,
+                    [(row[0], dict(zip(DIRECTORY_FIELDS, row[1:]))) for row in rows],
+                )
+            finally:
+                user_search_index.rebuilding = False
+
+        hits = user_search_index.search(
+            keyword, limit=limit, threshold=settings.USER_SEARCH_THRESHOLD
+        )
+        if not hits:
+            return []
+        result = await db_session.execute(
+            select(User).filter(User.id.in_([user_id for user_id, _ in hits]))
+        )
+        users = {user.id: user for user in result.scalars().all()}
+        return [(users[user_id], score) for user_id, score in hits if user_id in users]
+
+    async def authenticate_async(
+        self, db_session: AsyncSession, *, email: str, password: str
+    ) -> Optional[User]:
+        """
+        Method to Authenticate user
+        """
+        user_exist = await self.get_by_email_async(db_session, email=email)
+        if not user_exist:
+            return None
+        verified, new_hash = await password_service.verify_and_update(
+            password, user_exist.password
+        )
+        if not verified:
+            return None
+        if new_hash:
+            # the bcrypt cost changed since this hash was made
+            user_exist.password = new_hash
+            await db_session.commit()
+        return user_exist
+
     def is_admin(self, user_value: User) -> bool:
         """
         Method to Check if user is admin
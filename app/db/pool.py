@@ -0,0 +1,169 @@
+"""
+    CONNECTION POOL FILE
+"""
+import bisect
+import threading
+import time
+from typing import Any, Dict, Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.configuration import settings
+
+# upper bounds, in milliseconds, of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """
+    Counters of one connection pool: checkout waits, overflow connections,
+    timeouts and invalidations
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Any = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_sum_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def observe_wait(self, seconds: float) -> None:
+        """
+        Record the time a checkout waited for a connection
+        """
+        wait_ms = seconds * 1000
+        with self._lock:
+            self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+            self.wait_sum_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+    def increment(self, counter: str) -> None:
+        """
+        Add one to a counter
+        """
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters along with the live state of the pool
+        """
+        pool = self.engine.pool if self.engine is not None else None
+        live = {"pool": type(pool).__name__ if pool is not None else None}
+        if isinstance(pool, QueuePool):
+            live.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+        waits = sum(self.wait_buckets)
+        buckets, cumulative = {}, 0
+        for bound, count in zip(WAIT_BUCKETS_MS + ("+Inf",), self.wait_buckets):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "name": self.name,
+            **live,
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+            "invalidations": self.invalidations,
+            "soft_invalidations": self.soft_invalidations,
+            "wait_ms": {
+                "count": waits,
+                "sum": self.wait_sum_ms,
+                "max": self.wait_max_ms,
+                "mean": self.wait_sum_ms / waits if waits else 0.0,
+                "buckets": buckets,
+            },
+        }
+
+
+# metrics of every engine created through `engine_options`, by engine name
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def _timed_pool(base: Type[QueuePool], metrics: PoolMetrics) -> Type[QueuePool]:
+    """
+    Subclass a queue pool to time how long each checkout waits, a subclass
+    per engine so `Pool.recreate` keeps the timing
+    """
+
+    class TimedPool(base):  # type: ignore
+        def _do_get(self) -> Any:
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                metrics.increment("timeouts")
+                raise
+            finally:
+                metrics.observe_wait(time.perf_counter() - start)
+
+    TimedPool.__name__ = base.__name__
+    return TimedPool
+
+
+def engine_options(name: str, url: Any, *, asynchronous: bool) -> Dict[str, Any]:
+    """
+    Return the pool keyword arguments of `create_engine` /
+    `create_async_engine` from the settings. SQLite keeps the pool its
+    dialect picks (NullPool / StaticPool), which takes no sizing
+    """
+    metrics = pool_metrics[name] = PoolMetrics(name)
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if make_url(str(url)).get_backend_name() == "sqlite":
+        return options
+    options.update(
+        poolclass=_timed_pool(
+            AsyncAdaptedQueuePool if asynchronous else QueuePool, metrics
+        ),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_use_lifo=settings.DB_POOL_USE_LIFO,
+    )
+    return options
+
+
+def instrument_engine(name: str, engine: Engine) -> None:
+    """
+    Attach the pool event listeners of an engine (the `sync_engine` of an
+    async one) to its metrics
+    """
+    metrics = pool_metrics[name]
+    # read the pool through the engine, `Engine.dispose` swaps it for a new
+    # one (which keeps the listeners below)
+    metrics.engine = engine
+
+    @event.listens_for(engine.pool, "connect")
+    def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        metrics.increment("connects")
+        pool = engine.pool
+        if isinstance(pool, QueuePool) and pool.overflow() > 0:
+            metrics.increment("overflow_events")
+
+    @event.listens_for(engine.pool, "checkout")
+    def on_checkout(dbapi_connection: Any, connection_record: Any, proxy: Any) -> None:
+        metrics.increment("checkouts")
+
+    @event.listens_for(engine.pool, "invalidate")
+    def on_invalidate(dbapi_connection: Any, connection_record: Any, excep: Any):
+        metrics.increment("invalidations")
+
+    @event.listens_for(engine.pool, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection: Any, connection_record: Any, excep: Any):
+        metrics.increment("soft_invalidations")
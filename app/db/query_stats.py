@@ -0,0 +1,147 @@
+"""
+    QUERY INSTRUMENTATION FILE
+"""
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.configuration import settings
+from app.logger import logger
+
+
+class QueryStats:
+    """
+    Statements executed while handling one request
+    """
+
+    __slots__ = ("count", "total", "slowest", "slowest_statement", "statements")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, seconds: float) -> None:
+        """
+        Record an executed statement
+        """
+        self.count += 1
+        self.total += seconds
+        if seconds > self.slowest:
+            self.slowest = seconds
+            self.slowest_statement = statement
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Return the statements executed at least `threshold` times, the
+        signature of a N+1 pattern (the same query run once per row)
+        """
+        return sorted(
+            (
+                (statement, count)
+                for statement, count in self.statements.items()
+                if count >= threshold
+            ),
+            key=lambda item: -item[1],
+        )
+
+    def headers(self) -> Dict[str, str]:
+        """
+        Return the debug response headers
+        """
+        return {
+            "X-DB-Query-Count": str(self.count),
+            "X-DB-Time-Ms": "%.2f" % (self.total * 1000),
+            "X-DB-Slowest-Ms": "%.2f" % (self.slowest * 1000),
+            "X-DB-Repeated-Statements": str(
+                len(self.repeated(settings.N_PLUS_ONE_THRESHOLD))
+            ),
+        }
+
+
+# stats of the request being handled, the async sessions run their
+# statements in greenlets which inherit the context of the calling task
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    seconds = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    if seconds * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s",
+            seconds * 1000,
+            conn.engine.url.database,
+            " ".join(statement.split()),
+        )
+
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware collecting the statements of every HTTP request:
+    statements repeated within the request are logged as probable N+1
+    patterns, and in debug mode the query count, total and slowest query
+    time are added to the response headers
+    """
+
+    def __init__(self, app: ASGIApp, debug: bool = False):
+        self.app = app
+        self.debug = debug
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(stats.headers())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper if self.debug else send)
+        finally:
+            current_query_stats.reset(token)
+            for statement, count in stats.repeated(settings.N_PLUS_ONE_THRESHOLD):
+                logger.warning(
+                    "Probable N+1 on %s %s, statement run %d times: %s",
+                    scope["method"],
+                    scope["path"],
+                    count,
+                    " ".join(statement.split()),
+                )
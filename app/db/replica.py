@@ -0,0 +1,175 @@
+"""
+    READ REPLICA FILE
+"""
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.db.pool import engine_options, instrument_engine
+from app.logger import logger
+
+# seconds since the last transaction replayed on a Postgres standby, or 0
+# when it replayed all the WAL it received: an idle primary sends no new
+# transactions, the replay timestamp then ages while the standby is current
+REPLICATION_LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+class Replica:
+    """
+    A read replica engine, created on first use, with its last known health
+    """
+
+    def __init__(self, name: str, url: str):
+        self.url = url
+        self._label = name
+        self._engine: Optional[AsyncEngine] = None
+        self.healthy = True
+        self.checking = False
+        self.checked_at = float("-inf")
+        self.failures = 0
+        self.lag: Optional[float] = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """
+        Engine of the replica
+        """
+        if self._engine is None:
+            self._engine = create_async_engine(
+                self.url, **engine_options(self._label, self.url, asynchronous=True)
+            )
+            instrument_engine(self._label, self._engine.sync_engine)
+        return self._engine
+
+    @property
+    def name(self) -> str:
+        """
+        Url of the replica without its password
+        """
+        return repr(make_url(self.url))
+
+
+class ReplicaSet:
+    """
+    Round robin over the healthy read replicas. Health is checked lazily: a
+    replica whose last check is older than `check_interval` is pinged by the
+    request picking it, a replica that fails a query is marked down until
+    its next check
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        *,
+        check_interval: float,
+        check_timeout: float,
+        max_lag: Optional[float] = None,
+    ):
+        self.replicas = [
+            Replica("replica-" + str(index), url) for index, url in enumerate(urls)
+        ]
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.max_lag = max_lag
+        self._cursor = itertools.cycle(range(len(self.replicas)))
+        self.fallbacks = 0
+
+    async def pick(self) -> Optional[AsyncEngine]:
+        """
+        Return the engine of the next healthy replica, None when there is no
+        replica to read from and the primary has to be used
+        """
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._cursor)]
+            if (
+                not replica.checking
+                and time.monotonic() - replica.checked_at >= self.check_interval
+            ):
+                await self._check(replica)
+            if replica.healthy:
+                return replica.engine
+        if self.replicas:
+            self.fallbacks += 1
+        return None
+
+    def mark_down(self, engine: AsyncEngine) -> None:
+        """
+        Take a replica out of rotation after a connection failure
+        """
+        for replica in self.replicas:
+            if replica._engine is engine:
+                self._set_health(replica, False, "query failed")
+
+    async def _check(self, replica: Replica) -> None:
+        """
+        Ping a replica, and compare its replication lag to `max_lag` on Postgres
+        """
+        replica.checking = True
+        try:
+            lag = await asyncio.wait_for(self._probe(replica), self.check_timeout)
+        except Exception as excep:
+            self._set_health(replica, False, repr(excep))
+        else:
+            replica.lag = lag
+            if self.max_lag is not None and lag is not None and lag > self.max_lag:
+                self._set_health(replica, False, "lagging " + str(lag) + "s")
+            else:
+                self._set_health(replica, True, "ok")
+        finally:
+            replica.checking = False
+
+    async def _probe(self, replica: Replica) -> Optional[float]:
+        async with replica.engine.connect() as connection:
+            if self.max_lag is not None and replica.engine.dialect.name == "postgresql":
+                result = await connection.execute(text(REPLICATION_LAG_SQL))
+                return float(result.scalar())
+            await connection.execute(text("SELECT 1"))
+            return None
+
+    def _set_health(self, replica: Replica, healthy: bool, reason: str) -> None:
+        replica.checked_at = time.monotonic()
+        if not healthy:
+            replica.failures += 1
+        if healthy != replica.healthy:
+            log = logger.info if healthy else logger.warning
+            log(
+                "Read replica %s is %s: %s",
+                replica.name,
+                "up" if healthy else "down",
+                reason,
+            )
+        replica.healthy = healthy
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the health of every replica
+        """
+        return {
+            "fallbacks": self.fallbacks,
+            "replicas": [
+                {
+                    "url": replica.name,
+                    "healthy": replica.healthy,
+                    "failures": replica.failures,
+                    "lag_seconds": replica.lag,
+                }
+                for replica in self.replicas
+            ],
+        }
+
+    async def dispose(self) -> None:
+        """
+        Close the connections of every replica
+        """
+        for replica in self.replicas:
+            if replica._engine is not None:
+                await replica._engine.dispose()
@@ -1,10 +1,75 @@
 """
     SESSION MANAGEMENT FILE
 """
+import functools
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.configuration import settings
+from app.db.pool import engine_options, instrument_engine
+from app.db.replica import ReplicaSet
+
+
+@functools.lru_cache()
+def get_engine() -> Engine:
+    """
+    Method to create the blocking engine on first use, only the sync code
+    paths need it (and its driver import)
+    """
+    engine = create_engine(
+        settings.SQLALCHEMY_DATABASE_URI,
+        **engine_options(
+            "primary", settings.SQLALCHEMY_DATABASE_URI, asynchronous=False
+        ),
+    )
+    instrument_engine("primary", engine)
+    return engine
+
+
+# bound to `get_engine()` when a session is opened
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+@functools.lru_cache()
+def get_async_engine() -> AsyncEngine:
+    """
+    Method to create the async engine (and import its driver) on first use
+    rather than at import
+    """
+    engine = create_async_engine(
+        settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+        **engine_options(
+            "primary-async", settings.SQLALCHEMY_ASYNC_DATABASE_URI, asynchronous=True
+        ),
+    )
+    instrument_engine("primary-async", engine.sync_engine)
+    return engine
+
+
+class AsyncSessionMaker(sessionmaker):
+    """
+    Session factory binding the sessions to `get_async_engine()` unless
+    they are given another bind
+    """
+
+    def __call__(self, **local_kw):
+        if "bind" not in local_kw:
+            local_kw["bind"] = get_async_engine()
+        return super().__call__(**local_kw)
+
+
+AsyncSessionLocal = AsyncSessionMaker(
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+read_replicas = ReplicaSet(
+    settings.SQLALCHEMY_REPLICA_URIS,
+    check_interval=settings.REPLICA_CHECK_INTERVAL_SECONDS,
+    check_timeout=settings.REPLICA_CHECK_TIMEOUT_SECONDS,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+)
@@ -47,3 +47,35 @@ post_not_found_by_user = HTTPException(
     status_code=status.HTTP_404_NOT_FOUND,
     detail="Post Does Not Exist for this User!",
 )
+
+invalid_cursor = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid Pagination Cursor!",
+)
+
+not_enough_privileges = HTTPException(
+    status_code=status.HTTP_403_FORBIDDEN,
+    detail="Not Enough Privileges!",
+)
+
+password_service_busy = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Service Busy! Please Try Again.",
+    headers={"Retry-After": "1"},
+)
+
+bulk_too_large = HTTPException(
+    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    detail="Too Many Items In One Bulk Request!",
+)
+
+too_many_requests = HTTPException(
+    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+    detail="Too Many Requests! Please Try Again Later.",
+)
+
+service_overloaded = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Service Overloaded! Please Try Again.",
+    headers={"Retry-After": "1"},
+)
@@ -1,35 +1,275 @@
 """
     MAIN FILE FOR LOGGER IMPLEMENTATION
+
+    Request code only puts records on a bounded queue; a listener thread
+    writes them to the hourly rotating file in batches. The log directory
+    is created, and the listener started, by the first record.
 """
+import atexit
+import json
 import logging
 import os
+import queue
+import random
+import threading
+import uuid
+from contextvars import ContextVar
 from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Any, Dict, List, Optional
 
-day = datetime.now().strftime("%d-%m-%Y-%H")
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.configuration import settings
+
+# id and scope of the request being handled, read by `ContextFilter`
+request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "request_context", default=None
+)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Add the request id and route template of the current request to the
+    records, "-" outside of a request
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = request_context.get()
+        record.request_id = "-"
+        record.route = "-"
+        if context is not None:
+            record.request_id = context["request_id"]
+            route = context["scope"].get("route")
+            record.route = getattr(route, "path_format", context["scope"]["path"])
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the records of the high volume levels, e.g.
+    {"DEBUG": 0.1} keeps one debug record in ten
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = {
+            logging.getLevelName(level.upper()): rate for level, rate in rates.items()
+        }
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno)
+        if rate is None or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler which drops the record rather than blocking when the
+    queue is full, and starts the listener on the first record
+    """
+
+    def __init__(self, log_queue: "queue.Queue[Any]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.listener: Optional["BatchingQueueListener"] = None
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.listener is not None:
+            self.listener.ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchedFileHandler(TimedRotatingFileHandler):
+    """
+    Rotating file handler leaving the flushes to the listener, once per
+    batch instead of once per record
+    """
+
+    def flush(self) -> None:
+        pass
+
+    def flush_batch(self) -> None:
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    Queue listener draining up to `batch_size` records per wake up
+    """
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue[Any]",
+        handler: BatchedFileHandler,
+        batch_size: int,
+    ):
+        super().__init__(log_queue, handler, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.written = 0
+        self._start_lock = threading.Lock()
 
-if not os.path.exists("app/Logs"):
-    os.makedirs("app/Logs")
+    def ensure_started(self) -> None:
+        """
+        Create the log directory and start the thread, once
+        """
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                os.makedirs(settings.LOG_DIR, exist_ok=True)
+                self.start()
+                atexit.register(self.stop)
+
+    def enqueue_sentinel(self) -> None:
+        # wait for room, a full queue must not lose the stop signal
+        self.queue.put(self._sentinel)
+
+    def stop(self) -> None:
+        """
+        Write the queued records and stop the thread
+        """
+        with self._start_lock:
+            if self._thread is not None:
+                super().stop()
+
+    def _monitor(self) -> None:
+        log_queue = self.queue
+        while True:
+            batch: List[Any] = [log_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                    continue
+                self.handle(record)
+                self.written += 1
+            for handler in self.handlers:
+                handler.flush_batch()
+            for _ in batch:
+                log_queue.task_done()
+            if stop:
+                return
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per record
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(
+            {
+                "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                "request_id": getattr(record, "request_id", "-"),
+                "route": getattr(record, "route", "-"),
+                "path": record.pathname,
+                "function": record.funcName,
+                "line": record.lineno,
+            }
+        )
+
+
+class LogContextMiddleware:
+    """
+    Pure ASGI middleware giving every request an id, taken from the
+    X-Request-ID header when present, echoed back in the response
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+        request_id = request_id or uuid.uuid4().hex
+        token = request_context.set({"request_id": request_id, "scope": scope})
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_context.reset(token)
+
+
+day = datetime.now().strftime("%d-%m-%Y-%H")
 
 # create logger
 logger = logging.getLogger("log")
 logger.setLevel(level=logging.DEBUG)
 
 # set formatter
-logFileFormatter = logging.Formatter(
-    fmt="%(levelname)s %(asctime)s \t %(pathname)s --> %("
-    "funcName)s (Line %(lineno)s) - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+if settings.LOG_JSON:
+    logFileFormatter: logging.Formatter = JSONFormatter()
+else:
+    logFileFormatter = logging.Formatter(
+        fmt="%(levelname)s %(asctime)s \t [%(request_id)s %(route)s] %(pathname)s "
+        "--> %(funcName)s (Line %(lineno)s) - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
 
-# set the handler
-fileHandler = TimedRotatingFileHandler(
-    filename=f"app/Logs/{day}:00_Project_Level.log",
+# set the handler, the file is opened by the first write
+fileHandler = BatchedFileHandler(
+    filename=os.path.join(settings.LOG_DIR, f"{day}:00_Project_Level.log"),
     when="h",
     interval=1,
     backupCount=24,
+    delay=True,
 )
-
 fileHandler.setFormatter(logFileFormatter)
 fileHandler.setLevel(level=logging.DEBUG)
-logger.addHandler(fileHandler)
+
+log_queue: "queue.Queue[Any]" = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+listener = BatchingQueueListener(
+    log_queue, fileHandler, batch_size=settings.LOG_BATCH_SIZE
+)
+sampling_filter = SamplingFilter(settings.LOG_SAMPLE_RATES)
+
+queueHandler = DroppingQueueHandler(log_queue)
+queueHandler.listener = listener
+queueHandler.addFilter(sampling_filter)
+queueHandler.addFilter(ContextFilter())
+logger.addHandler(queueHandler)
+
+
+def log_stats() -> Dict[str, Any]:
+    """
+    Return the counters of the logging pipeline
+    """
+    return {
+        "queued": log_queue.qsize(),
+        "queue_size": log_queue.maxsize,
+        "written": listener.written,
+        "dropped": queueHandler.dropped,
+        "sampled_out": sampling_filter.sampled_out,
+    }
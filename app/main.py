@@ -2,19 +2,38 @@
     MAIN APP FILE
 """
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
 
 from app import schemas
-from app.api.v1.routers import api_router
+from app.api.v1.routers import include_api_routers
+from app.core.admission import AdmissionMiddleware, admission_limiters
 from app.core.configuration import settings
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.responses import FastJSONResponse
+from app.core.security import password_service
+from app.core.view_counter import view_counter
+from app.db.query_stats import QueryStatsMiddleware
+from app.db.session import read_replicas
+from app.logger import LogContextMiddleware, listener
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    # orjson rendering, and single pass serialization on the API routes
+    default_response_class=(
+        FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse
+    ),
 )
 
 
+async def metrics():
+    """
+    API for the request metrics in the Prometheus text format
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.exception_handler(HTTPException)
 async def unicorn_exception_handler(request: Request, exc: HTTPException):
     """
@@ -26,6 +45,7 @@ async def unicorn_exception_handler(request: Request, exc: HTTPException):
             content={
                 "message": exc.detail,
             },
+            headers=getattr(exc, "headers", None),
         )
     except Exception as excep:
         return JSONResponse(
@@ -36,6 +56,66 @@ async def unicorn_exception_handler(request: Request, exc: HTTPException):
         )
 
 
+@app.on_event("startup")
+async def include_routes():
+    """
+    Add the routes. Building them copies every response model, the bulk of
+    the boot, so it happens when a server starts the app rather than on
+    import
+    """
+    if settings.METRICS_ENABLED:
+        app.add_api_route("/metrics", metrics, include_in_schema=False)
+    include_api_routers(app, settings.API_V1_STR)
+
+
+@app.on_event("startup")
+async def start_view_counter():
+    """
+    Start writing the post views in batches
+    """
+    view_counter.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_password_service():
+    """
+    Stop the password hashing threads
+    """
+    password_service.shutdown()
+
+
+@app.on_event("shutdown")
+async def flush_metrics():
+    """
+    Write the last metrics snapshot of this worker
+    """
+    registry.flush()
+
+
+@app.on_event("shutdown")
+async def dispose_read_replicas():
+    """
+    Close the read replica connections
+    """
+    await read_replicas.dispose()
+
+
+@app.on_event("shutdown")
+async def flush_view_counts():
+    """
+    Write the post views still pending in this worker
+    """
+    await view_counter.close()
+
+
+@app.on_event("shutdown")
+async def stop_log_listener():
+    """
+    Write the queued log records
+    """
+    listener.stop()
+
+
 # Set all CORS enabled origins
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
@@ -46,4 +126,14 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
-app.include_router(api_router, prefix=settings.API_V1_STR)
+app.add_middleware(QueryStatsMiddleware, debug=settings.DEBUG)
+
+# inside the metrics middleware so the shed requests are counted
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionMiddleware, limiters=admission_limiters)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=registry, router=app.router)
+
+# outermost, the request id covers the other middlewares
+app.add_middleware(LogContextMiddleware)
@@ -2,8 +2,19 @@
     POST MODEL FILE
 """
 from sqlalchemy.sql import func
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Table, ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    Table,
+    ARRAY,
+    event,
+    select,
+)
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.types import DateTime
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.mutable import MutableList
@@ -18,6 +29,20 @@ post_tag = Table(
     Column("tag_id", Integer, ForeignKey("tag.id")),
 )
 
+# view counts live apart from the post rows, so the batched increments never
+# lock a post, fire its search triggers or bump its `updated_at`
+post_view = Table(
+    "post_view",
+    Base.metadata,
+    Column(
+        "post_id",
+        Integer,
+        ForeignKey("post.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("views", Integer, nullable=False, server_default="0"),
+)
+
 
 class Category(Base):
     """
@@ -27,6 +52,7 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, index=True)
     description = Column(String(255))
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -45,6 +71,7 @@ class Tag(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, index=True)
     description = Column(String(255))
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -75,6 +102,51 @@ class Post(Base):
 
     tags = relationship("Tag", secondary=post_tag, back_populates="posts")
 
+    views = column_property(
+        func.coalesce(
+            select(post_view.c.views)
+            .where(post_view.c.post_id == id)
+            .scalar_subquery(),
+            0,
+        )
+    )
+
     @declared_attr
     def __searchable__(self) -> list:
         return ["title", "body"]
+
+
+# Full text search over title and body. Postgres keeps a generated, weighted
+# tsvector column with a GIN index; SQLite keeps an external content FTS5
+# table in sync with triggers. Both are created along with the post table.
+POST_SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE post ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED",
+        "CREATE INDEX ix_post_search_vector ON post USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE post_fts USING fts5("
+        "title, body, content='post', content_rowid='id')",
+        "CREATE TRIGGER post_fts_insert AFTER INSERT ON post BEGIN "
+        "INSERT INTO post_fts(rowid, title, body) "
+        "VALUES (new.id, new.title, new.body); END",
+        "CREATE TRIGGER post_fts_delete AFTER DELETE ON post BEGIN "
+        "INSERT INTO post_fts(post_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); END",
+        "CREATE TRIGGER post_fts_update AFTER UPDATE ON post BEGIN "
+        "INSERT INTO post_fts(post_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); "
+        "INSERT INTO post_fts(rowid, title, body) "
+        "VALUES (new.id, new.title, new.body); END",
+    ],
+}
+
+for dialect, statements in POST_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(
+            Post.__table__,
+            "after_create",
+            DDL(statement).execute_if(dialect=dialect),
+        )
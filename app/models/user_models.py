@@ -2,7 +2,7 @@
     USER MODEL FILE
 """
 from sqlalchemy.sql import func
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey
+from sqlalchemy import DDL, Boolean, Column, Integer, String, ForeignKey, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import DateTime
 from sqlalchemy.ext.declarative import declared_attr
@@ -23,6 +23,7 @@ class User(Base):
     password = Column(String, nullable=False)
     is_admin = Column(Boolean(), default=False)
     gender = Column(String)
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
     created = Column(DateTime(timezone=True), server_default=func.now())
     updated = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -31,3 +32,17 @@ class User(Base):
     @declared_attr
     def __searchable__(self) -> list:
         return ["first_name", "last_name", "email", "username"]
+
+
+# Trigram GIN indexes backing the user directory search on Postgres
+USER_TRIGRAM_DDL = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f'CREATE INDEX ix_user_{column}_trgm ON "user" USING GIN ({column} gin_trgm_ops)'
+    for column in ("first_name", "last_name", "email", "username")
+]
+
+for statement in USER_TRIGRAM_DDL:
+    event.listen(
+        User.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
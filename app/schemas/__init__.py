@@ -1,8 +1,18 @@
 """
     INIT FILE FOR SCHEMAS
 """
-from .user_schema import UserCreate, UserUpdate, UserBase, UserDisplay
+from .user_schema import (
+    UserCreate,
+    UserUpdate,
+    UserBase,
+    UserDisplay,
+    UserSearchResult,
+    UserSnapshot,
+)
 from .token_schema import Token, TokenPayload
+from .page_schema import Page
+from .bulk_schema import BulkItemError, BulkResult
+from .stats_schema import PostCount, PostStats
 from .post_schema import (
     CategoryBase,
     CategoryCreate,
@@ -17,4 +27,5 @@ from .post_schema import (
     PostUpdate,
     PostDisplay,
     PostDisplayDetailed,
+    PostSearchResult,
 )
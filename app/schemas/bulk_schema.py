@@ -0,0 +1,27 @@
+"""
+    BULK SCHEMA FILE
+"""
+from typing import Generic, List, TypeVar
+
+from pydantic import BaseModel
+from pydantic.generics import GenericModel
+
+ItemType = TypeVar("ItemType")
+
+
+class BulkItemError(BaseModel):
+    """
+    Bulk Item Error Schema, `index` is the position in the request body
+    """
+
+    index: int
+    detail: str
+
+
+class BulkResult(GenericModel, Generic[ItemType]):
+    """
+    Bulk Result Schema
+    """
+
+    created: List[ItemType]
+    errors: List[BulkItemError]
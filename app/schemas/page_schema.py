@@ -0,0 +1,17 @@
+"""
+    PAGE SCHEMA FILE
+"""
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic.generics import GenericModel
+
+ItemType = TypeVar("ItemType")
+
+
+class Page(GenericModel, Generic[ItemType]):
+    """
+    Keyset Page Schema
+    """
+
+    items: List[ItemType]
+    next_cursor: Optional[str] = None
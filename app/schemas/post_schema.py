@@ -42,6 +42,7 @@ class CategoryDisplay(CategoryBase):
     """
 
     id: int
+    post_count: int = 0
 
 
 class TagBase(BaseModel):
@@ -84,6 +85,7 @@ class TagDisplay(TagBase):
     """
 
     id: int
+    post_count: int = 0
 
     class Config:
         orm_mode = True
@@ -146,6 +148,19 @@ class PostDisplayDetailed(PostDisplay):
     """
 
     body: str
+    views: int = 0
+
+    class Config:
+        orm_mode = True
+
+
+class PostSearchResult(PostDisplayDetailed):
+    """
+    Post Search Result Schema
+    """
+
+    rank: float
+    snippet: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -0,0 +1,26 @@
+"""
+    STATS SCHEMA FILE
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class PostCount(BaseModel):
+    """
+    Post Count Schema
+    """
+
+    id: int
+    name: Optional[str] = None
+    post_count: int
+
+
+class PostStats(BaseModel):
+    """
+    Post Stats Schema, the entries with the most posts first
+    """
+
+    categories: List[PostCount]
+    tags: List[PostCount]
+    authors: List[PostCount]
@@ -56,3 +56,22 @@ class UserDisplay(UserBase):
 
     id: str
     username: Optional[str]
+
+
+class UserSearchResult(UserDisplay):
+    """
+    User Search Result Schema
+    """
+
+    score: float
+
+
+class UserSnapshot(UserBase):
+    """
+    Detached User Schema cached for authenticated requests
+    """
+
+    id: int
+    username: Optional[str]
+    is_admin: Optional[bool] = False
+    gender: Optional[GenderEnum]
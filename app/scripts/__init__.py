@@ -0,0 +1,3 @@
+"""
+    SCRIPTS INIT FILE
+"""
@@ -0,0 +1,31 @@
+"""
+    RECONCILE POST COUNTS FILE
+
+    Recompute the post counters of categories, tags and authors from the post
+    tables, e.g. nightly from cron:
+
+        python -m app.scripts.reconcile_post_counts
+"""
+import asyncio
+
+from app import crud
+from app.db.session import AsyncSessionLocal, get_async_engine
+from app.logger import logger
+
+
+async def reconcile() -> None:
+    """
+    Method to run the reconciliation and log the drifted rows per table
+    """
+    async with AsyncSessionLocal() as db_session:
+        corrected = await crud.post.reconcile_counts_async(db_session)
+    await get_async_engine().dispose()
+    for table, rows in corrected.items():
+        if rows:
+            logger.warning("Corrected %s drifted post counts in %s", rows, table)
+        else:
+            logger.info("Post counts of %s are consistent", table)
+
+
+if __name__ == "__main__":
+    asyncio.run(reconcile())
@@ -0,0 +1,320 @@
+"""
+    SYNTHETIC DATASET FILE
+
+    Generate users, categories, tags and posts for load and scaling tests.
+    The rows only depend on the arguments and the seed. Postgres is loaded
+    with COPY, other databases with batched executemany INSERTs, and users
+    share a few precomputed bcrypt hashes of `--password`. Progress goes to
+    the application log:
+
+        python -m app.scripts.seed --users 1000 --tags 500 --posts 1000000
+        python -m app.scripts.seed --database-url sqlite+aiosqlite:///./test.db --reset
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import random
+import string
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from passlib.hash import bcrypt
+from sqlalchemy import Table, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import crud
+from app.core.configuration import settings
+from app.logger import logger
+from app.models import Base, Category, Post, Tag, User, post_tag
+from app.models.enum_class_models import GenderEnum
+
+WORDS = (
+    "async await python fastapi database postgres sqlite index query cache "
+    "latency throughput replica pool cursor page search token session "
+    "schema model route request response worker queue batch stream "
+    "metric trace profile deploy docker server client network memory"
+).split()
+FIRST_NAMES = (
+    "Alice Bob Carol Dave Erin Frank Grace Heidi Ivan Judy Mallory Niaj "
+    "Olivia Peggy Rupert Sybil Trent Victor Walter Yusuf"
+).split()
+LAST_NAMES = (
+    "Smith Jones Brown Taylor Wilson Davies Evans Thomas Johnson Roberts "
+    "Walker Wright Robinson Thompson White Hughes Edwards Green Hall Wood"
+).split()
+BCRYPT_SALT_CHARS = (
+    "./" + string.ascii_uppercase + string.ascii_lowercase + string.digits
+)
+# posts are spread over the year before this date
+EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def password_hashes(password: str, count: int, rng: random.Random) -> List[str]:
+    """
+    Method to hash the password with `count` different, seeded salts, the
+    users reuse them instead of paying bcrypt once per row
+    """
+    hashes = []
+    for _ in range(count):
+        # the last salt character only carries 2 bits, keep it canonical
+        salt = "".join(rng.choice(BCRYPT_SALT_CHARS) for _ in range(21))
+        salt += rng.choice(".Oeu")
+        hasher = bcrypt.using(rounds=settings.BCRYPT_ROUNDS, salt=salt)
+        hashes.append(hasher.hash(password))
+    return hashes
+
+
+class TagSampler:
+    """
+    Draw distinct tag ids, uniformly or following a Zipf law where the
+    tag of rank k is picked proportionally to 1 / k**s
+    """
+
+    def __init__(self, tag_ids: Sequence[int], distribution: str, zipf_s: float):
+        self.tag_ids = tag_ids
+        weights = [
+            1.0 if distribution == "uniform" else 1.0 / (rank**zipf_s)
+            for rank in range(1, len(tag_ids) + 1)
+        ]
+        self.cumulative = list(itertools.accumulate(weights))
+
+    def sample(self, rng: random.Random, count: int) -> List[int]:
+        count = min(count, len(self.tag_ids))
+        total = self.cumulative[-1]
+        picked: Dict[int, None] = {}
+        while len(picked) < count:
+            index = bisect.bisect_left(self.cumulative, rng.random() * total)
+            picked[self.tag_ids[min(index, len(self.tag_ids) - 1)]] = None
+        return list(picked)
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+async def next_id(db_session: AsyncSession, table: Table) -> int:
+    """
+    Method to return the first free id of a table, new rows are appended
+    """
+    return (await db_session.execute(select(func.max(table.c.id)))).scalar() or 0
+
+
+async def load(
+    db_session: AsyncSession, table: Table, rows: List[Dict[str, Any]]
+) -> None:
+    """
+    Method to insert a batch of rows, with COPY on Postgres and a single
+    executemany INSERT elsewhere
+    """
+    if not rows:
+        return
+    connection = await db_session.connection()
+    if connection.dialect.name == "postgresql":
+        columns = list(rows[0])
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            table.name,
+            records=[tuple(row[column] for column in columns) for row in rows],
+            columns=columns,
+        )
+    else:
+        await db_session.execute(table.insert(), rows)
+
+
+async def load_batches(
+    db_session: AsyncSession,
+    table: Table,
+    rows: Iterator[Dict[str, Any]],
+    batch_size: int,
+) -> int:
+    """
+    Method to load rows in batches, one commit per batch
+    """
+    loaded = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return loaded
+        await load(db_session, table, batch)
+        await db_session.commit()
+        loaded += len(batch)
+
+
+async def reset_sequences(db_session: AsyncSession, tables: List[Table]) -> None:
+    """
+    Method to move the Postgres id sequences past the copied ids
+    """
+    connection = await db_session.connection()
+    if connection.dialect.name != "postgresql":
+        return
+    preparer = connection.dialect.identifier_preparer
+    for table in tables:
+        await db_session.execute(
+            text(
+                "SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+                f"coalesce((SELECT max(id) FROM {preparer.format_table(table)}), 1))"
+            ),
+            {"table": preparer.format_table(table)},
+        )
+    await db_session.commit()
+
+
+async def seed(args: argparse.Namespace) -> Dict[str, int]:
+    """
+    Method to create the schema if needed and load the generated rows,
+    returns the number of rows loaded per table
+    """
+    rng = random.Random(args.seed)
+    engine = create_async_engine(args.database_url)
+    async with engine.begin() as connection:
+        if args.reset:
+            await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+    user_table, category_table = User.__table__, Category.__table__
+    tag_table, post_table = Tag.__table__, Post.__table__
+    loaded: Dict[str, int] = {}
+    async with AsyncSession(engine) as db_session:
+        user_start = await next_id(db_session, user_table)
+        category_start = await next_id(db_session, category_table)
+        tag_start = await next_id(db_session, tag_table)
+        post_start = await next_id(db_session, post_table)
+        if args.posts and (not args.users or not args.categories):
+            raise SystemExit("posts need at least one user and one category")
+
+        hashes = password_hashes(args.password, args.hash_pool, rng)
+        genders = [gender.value for gender in GenderEnum]
+        loaded["user"] = await load_batches(
+            db_session,
+            user_table,
+            (
+                {
+                    "id": user_id,
+                    "username": "user" + str(user_id),
+                    "first_name": rng.choice(FIRST_NAMES),
+                    "last_name": rng.choice(LAST_NAMES),
+                    "email": "user" + str(user_id) + "@example.com",
+                    "password": hashes[user_id % len(hashes)],
+                    "is_admin": False,
+                    "gender": rng.choice(genders),
+                    "post_count": 0,
+                    "created": EPOCH,
+                }
+                for user_id in range(user_start + 1, user_start + args.users + 1)
+            ),
+            args.batch_size,
+        )
+        loaded["category"] = await load_batches(
+            db_session,
+            category_table,
+            (
+                {
+                    "id": category_id,
+                    "name": rng.choice(WORDS) + "-" + str(category_id),
+                    "description": sentence(rng, 8),
+                    "post_count": 0,
+                    "created_at": EPOCH,
+                }
+                for category_id in range(
+                    category_start + 1, category_start + args.categories + 1
+                )
+            ),
+            args.batch_size,
+        )
+        loaded["tag"] = await load_batches(
+            db_session,
+            tag_table,
+            (
+                {
+                    "id": tag_id,
+                    "name": rng.choice(WORDS) + "-" + str(tag_id),
+                    "description": sentence(rng, 6),
+                    "post_count": 0,
+                    "created_at": EPOCH,
+                }
+                for tag_id in range(tag_start + 1, tag_start + args.tags + 1)
+            ),
+            args.batch_size,
+        )
+
+        sampler = TagSampler(
+            range(tag_start + 1, tag_start + args.tags + 1),
+            args.tag_distribution,
+            args.zipf_s,
+        )
+        deltas = crud.post.count_deltas([], 1)
+        loaded["post"] = loaded["post_tag"] = 0
+        post_ids = iter(range(post_start + 1, post_start + args.posts + 1))
+        while True:
+            posts, links = [], []
+            for post_id in itertools.islice(post_ids, args.batch_size):
+                category_id = category_start + rng.randint(1, args.categories)
+                author_id = user_start + rng.randint(1, args.users)
+                tag_ids = (
+                    sampler.sample(rng, rng.randint(args.min_tags, args.max_tags))
+                    if args.tags
+                    else []
+                )
+                created_at = EPOCH - timedelta(seconds=rng.randint(0, 365 * 86400))
+                posts.append(
+                    {
+                        "id": post_id,
+                        "title": sentence(rng, 3)[:40] + " " + str(post_id),
+                        "body": sentence(rng, 20)[:255],
+                        "author_id": author_id,
+                        "category_id": category_id,
+                        "created_at": created_at,
+                    }
+                )
+                links.extend(
+                    {"post_id": post_id, "tag_id": tag_id} for tag_id in tag_ids
+                )
+                crud.post.count_deltas([(category_id, author_id, tag_ids)], 1, deltas)
+            if not posts:
+                break
+            await load(db_session, post_table, posts)
+            await load(db_session, post_tag, links)
+            await db_session.commit()
+            loaded["post"] += len(posts)
+            loaded["post_tag"] += len(links)
+            logger.info("Loaded %s posts", loaded["post"])
+
+        await reset_sequences(
+            db_session, [user_table, category_table, tag_table, post_table]
+        )
+        await crud.post.apply_counts_async(db_session, deltas)
+    await engine.dispose()
+    return loaded
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument(
+        "--database-url", default=settings.SQLALCHEMY_ASYNC_DATABASE_URI
+    )
+    parser.add_argument("--reset", action="store_true", help="drop the tables first")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--min-tags", type=int, default=1)
+    parser.add_argument("--max-tags", type=int, default=5)
+    parser.add_argument(
+        "--tag-distribution", choices=("uniform", "zipf"), default="zipf"
+    )
+    parser.add_argument("--zipf-s", type=float, default=1.1)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--password", default="Passw0rd!seed")
+    parser.add_argument(
+        "--hash-pool", type=int, default=4, help="distinct password hashes"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    loaded_rows = asyncio.run(seed(parse_args()))
+    logger.info("Seeded %s in %.1fs", loaded_rows, time.perf_counter() - started)
@@ -6,7 +6,6 @@ from datetime import datetime, timedelta
 from typing import Optional, Union, List
 
 from email_validator import validate_email
-from password_validator import PasswordValidator
 from jose import jwt
 
 from app.exception.base_exception import invalid_email
@@ -29,6 +28,9 @@ def is_valid_password(password):
     """
     Validate Password
     """
+    # imported on first use, only the user create / update paths need it
+    from password_validator import PasswordValidator
+
     schema = PasswordValidator()
     schema.min(10).max(
         20
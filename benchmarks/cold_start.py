@@ -0,0 +1,172 @@
+"""
+    COLD START BENCHMARK FILE
+
+    Measure, in fresh interpreters, how long importing `app.main` takes (with
+    the modules contributing most, from `python -X importtime`) and how long
+    a uvicorn worker takes from spawn to its first response. Exits non zero
+    when a median is over its budget, so CI can guard the boot time; the
+    default budgets leave headroom over the 0.9s import / 1.1s first
+    response measured after the cold start work, 0 disables a budget.
+    `tests/test_cold_start.py` runs it with the defaults when COLD_START_BUDGETS=1.
+
+        python -m benchmarks.cold_start --runs 5
+        python -m benchmarks.cold_start --max-import-seconds 1.5 --max-first-response-seconds 3
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+# seconds, median over the runs
+MAX_IMPORT_SECONDS = 2.0
+MAX_FIRST_RESPONSE_SECONDS = 3.0
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def import_profile() -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Import `app.main` in a new interpreter, return the total seconds and
+    the self time of every module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total, modules = 0.0, []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        modules.append((module, int(self_us) / 1e6))
+        if len(indent) == 1:
+            # top level imports, `app.main` and what `-c` pulled in first
+            total += int(cumulative_us) / 1e6
+    return total, modules
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_response(path: str, timeout: float) -> float:
+    """
+    Spawn a uvicorn worker and return the seconds until it answers `path`,
+    any status counts
+    """
+    port = free_port()
+    url = "http://127.0.0.1:" + str(port) + path
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ]
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                urllib.request.urlopen(url, timeout=1)
+                return time.perf_counter() - start
+            except urllib.error.HTTPError:
+                return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                if server.poll() is not None:
+                    raise RuntimeError("the server exited during startup")
+                time.sleep(0.01)
+        raise RuntimeError("no response within " + str(timeout) + "s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Run the measurements, print the report and check the budgets
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--path", default="/", help="path of the first request")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--max-import-seconds", type=float, default=MAX_IMPORT_SECONDS)
+    parser.add_argument(
+        "--max-first-response-seconds",
+        type=float,
+        default=MAX_FIRST_RESPONSE_SECONDS,
+    )
+    parser.add_argument("--output", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    imports, self_times = [], {}  # type: List[float], Dict[str, List[float]]
+    for _ in range(args.runs):
+        total, modules = import_profile()
+        imports.append(total)
+        for module, seconds in modules:
+            self_times.setdefault(module, []).append(seconds)
+    first_responses = [
+        first_response(args.path, args.timeout) for _ in range(args.runs)
+    ]
+
+    slowest = sorted(
+        (
+            (module, statistics.median(seconds))
+            for module, seconds in self_times.items()
+        ),
+        key=lambda item: -item[1],
+    )[: args.top]
+    report: Dict[str, Any] = {
+        "runs": args.runs,
+        "import_seconds": statistics.median(imports),
+        "first_response_seconds": statistics.median(first_responses),
+        "slowest_modules": [
+            {"module": module, "self_seconds": seconds} for module, seconds in slowest
+        ],
+    }
+
+    print(
+        "import app.main   %.3fs (median of %d)" % (report["import_seconds"], args.runs)
+    )
+    print("first response    %.3fs" % report["first_response_seconds"])
+    print("slowest modules (self time):")
+    for module, seconds in slowest:
+        print("  %8.1f ms  %s" % (seconds * 1000, module))
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    failures = []
+    if args.max_import_seconds and report["import_seconds"] > args.max_import_seconds:
+        failures.append("import over %.3fs" % args.max_import_seconds)
+    if (
+        args.max_first_response_seconds
+        and report["first_response_seconds"] > args.max_first_response_seconds
+    ):
+        failures.append("first response over %.3fs" % args.max_first_response_seconds)
+    if failures:
+        print("FAILED:", ", ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
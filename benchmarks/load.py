@@ -0,0 +1,324 @@
+"""
+    LOAD BENCHMARK FILE
+
+    Boot `app.main:app` with uvicorn against a database freshly seeded by
+    `app.scripts.seed`, drive
+    a fixed mix of reads, searches, logins and writes at a fixed concurrency
+    and write throughput and latency percentiles per route to a JSON file,
+    to compare across commits.
+
+        python -m benchmarks.load --concurrency 16 --duration 30
+        python -m benchmarks.load --database-url postgresql+asyncpg://u:p@localhost/bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# first user of the seeded dataset
+BENCH_EMAIL = "user1@example.com"
+BENCH_PASSWORD = "Bench-passw0rd!"
+WORDS = (
+    "fastapi python async database query cache index search latency "
+    "throughput replica pool tag category post author benchmark server"
+).split()
+
+# route label, relative weight
+MIX = (
+    ("GET /post/", 30),
+    ("GET /post/{id}", 30),
+    ("GET /post/search", 10),
+    ("GET /post/byTag/{tag_id}", 15),
+    ("POST /login/", 5),
+    ("POST /post/create", 10),
+)
+
+
+async def seed_database(url: str, args: argparse.Namespace) -> None:
+    """
+    Recreate the schema and load the synthetic dataset
+    """
+    from app.scripts.seed import parse_args, seed
+
+    await seed(
+        parse_args(
+            [
+                "--database-url",
+                url,
+                "--reset",
+                "--users",
+                str(args.users),
+                "--categories",
+                str(args.categories),
+                "--tags",
+                str(args.tags),
+                "--posts",
+                str(args.posts),
+                "--seed",
+                str(args.seed),
+                "--password",
+                BENCH_PASSWORD,
+            ]
+        )
+    )
+
+
+def start_server(url: str, port: int, workers: int) -> subprocess.Popen:
+    """
+    Run uvicorn in a subprocess, pointed at the seeded database
+    """
+    env = dict(os.environ, SQLALCHEMY_ASYNC_DATABASE_URI=url)
+    env.setdefault("API_V1_STR", "/api/v1")
+    env.setdefault("SECRET_KEY", "benchmark")
+    # every simulated client shares one ip
+    env.setdefault("RATE_LIMIT_ENABLED", "false")
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    """
+    Poll the OpenAPI schema until the server answers
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            response = await client.get("/openapi.json")
+            if response.status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("the server did not start")
+        await asyncio.sleep(0.2)
+
+
+async def login(client: httpx.AsyncClient) -> httpx.Response:
+    return await client.post(
+        "/login/", data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD}
+    )
+
+
+async def run_request(
+    client: httpx.AsyncClient,
+    route: str,
+    rng: random.Random,
+    headers: Dict[str, str],
+    args: argparse.Namespace,
+) -> httpx.Response:
+    """
+    Send one request of the given route with random parameters
+    """
+    if route == "GET /post/":
+        return await client.get("/post/", params={"limit": 20})
+    if route == "GET /post/{id}":
+        return await client.get("/post/" + str(rng.randint(1, args.posts)))
+    if route == "GET /post/search":
+        return await client.get("/post/search", params={"keyword": rng.choice(WORDS)})
+    if route == "GET /post/byTag/{tag_id}":
+        return await client.get("/post/byTag/" + str(rng.randint(1, args.tags)))
+    if route == "POST /login/":
+        return await login(client)
+    return await client.post(
+        "/post/create",
+        json={
+            "title": "bench " + str(rng.getrandbits(64)),
+            "body": " ".join(rng.choice(WORDS) for _ in range(20)),
+            "category_id": rng.randint(1, args.categories),
+            "author_id": rng.randint(1, args.users),
+            "tags": rng.sample(range(1, args.tags + 1), min(2, args.tags)),
+        },
+        headers=headers,
+    )
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    rng: random.Random,
+    headers: Dict[str, str],
+    args: argparse.Namespace,
+    warmup_until: float,
+    stop_at: float,
+    samples: List[Tuple[str, float, int]],
+) -> None:
+    """
+    Send requests back to back until `stop_at`, recording those sent after
+    the warmup
+    """
+    routes = [route for route, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    while time.monotonic() < stop_at:
+        route = rng.choices(routes, weights)[0]
+        start = time.monotonic()
+        try:
+            status = (await run_request(client, route, rng, headers, args)).status_code
+        except httpx.HTTPError:
+            status = 0
+        if start >= warmup_until:
+            samples.append((route, time.monotonic() - start, status))
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest rank percentile
+    """
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(samples: List[Tuple[str, float, int]], seconds: float) -> Dict[str, Any]:
+    """
+    Throughput, error count and latency percentiles, in milliseconds
+    """
+    latencies = sorted(latency for _, latency, _ in samples)
+    errors = sum(1 for _, _, status in samples if not 200 <= status < 400)
+    if not latencies:
+        return {"requests": 0, "errors": 0, "rps": 0.0}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / seconds,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Drive the load against the running server
+    """
+    base_url = "http://127.0.0.1:" + str(args.port) + args.api_prefix
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30
+    ) as client:
+        await wait_ready(client, args.startup_timeout)
+        token = (await login(client)).json()["access_token"]
+        headers = {"Authorization": "Bearer " + token}
+
+        samples: List[Tuple[str, float, int]] = []
+        warmup_until = time.monotonic() + args.warmup
+        stop_at = warmup_until + args.duration
+        await asyncio.gather(
+            *(
+                worker(
+                    client,
+                    random.Random(args.seed * 1000 + index),
+                    headers,
+                    args,
+                    warmup_until,
+                    stop_at,
+                    samples,
+                )
+                for index in range(args.concurrency)
+            )
+        )
+
+    routes = {}
+    for route, _ in MIX:
+        routes[route] = summarize(
+            [sample for sample in samples if sample[0] == route], args.duration
+        )
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "total": summarize(samples, args.duration),
+        "routes": routes,
+    }
+
+
+def main() -> None:
+    """
+    Seed, boot, load, report
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument(
+        "--database-url",
+        help="async database url, a temporary SQLite file by default",
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--api-prefix", default=os.environ.get("API_V1_STR", "/api/v1"))
+    parser.add_argument("--startup-timeout", type=float, default=30)
+    parser.add_argument("--output", default="benchmarks/results/load.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or "sqlite+aiosqlite:///" + os.path.join(
+            directory, "bench.db"
+        )
+        asyncio.run(seed_database(url, args))
+        server = start_server(url, args.port, args.workers)
+        try:
+            report = asyncio.run(run(args))
+        finally:
+            server.terminate()
+            server.wait()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+
+    print(
+        f"{'route':<28}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+    )
+    for route, stats in list(report["routes"].items()) + [("total", report["total"])]:
+        if not stats["requests"]:
+            continue
+        print(
+            f"{route:<28}{stats['rps']:>9.1f}{stats['p50_ms']:>9.1f}"
+            f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['errors']:>8}"
+        )
+    print("written to", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+    TEST CONFIGURATION FILE
+
+    The tests run against a throwaway aiosqlite database, with lazy loads
+    raising on the list reads so a N+1 regression fails loudly.
+"""
+import asyncio
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="fastapi-blog-tests-")
+DATABASE_PATH = os.path.join(TEST_DIR, "test.db")
+
+os.environ.update(
+    {
+        "SQLALCHEMY_ASYNC_DATABASE_URI": "sqlite+aiosqlite:///" + DATABASE_PATH,
+        "SQLALCHEMY_RAISE_ON_LAZY_LOAD": "true",
+        "LOG_DIR": os.path.join(TEST_DIR, "Logs"),
+        "METRICS_DIR": os.path.join(TEST_DIR, "metrics"),
+        "RATE_LIMIT_ENABLED": "false",
+        "BCRYPT_ROUNDS": "4",
+    }
+)
+for name, value in {
+    "API_V1_STR": "/api/v1",
+    "PROJECT_NAME": "Blog",
+    "SECRET_KEY": "test-secret",
+    "POSTGRES_USER": "blog",
+    "POSTGRES_PASSWORD": "blog",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "blog",
+}.items():
+    os.environ.setdefault(name, value)
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.core.cache import user_cache  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.db.session import AsyncSessionLocal, get_async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Base, Category, Post, Tag, User  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def run(loop):
+    """
+    Run a coroutine on the loop shared by the tests
+    """
+    return loop.run_until_complete
+
+
+@pytest.fixture
+def database(run):
+    """
+    Fresh schema for every test
+    """
+    if os.path.exists(DATABASE_PATH):
+        os.remove(DATABASE_PATH)
+    # the ids start over with every database
+    user_cache.clear()
+
+    async def create_all():
+        async with get_async_engine().begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    run(create_all())
+    yield
+    run(get_async_engine().dispose())
+
+
+@pytest.fixture(scope="session")
+def started_app(loop):
+    """
+    The app after its startup hooks, which add the routes
+    """
+    loop.run_until_complete(app.router.startup())
+    yield app
+    loop.run_until_complete(app.router.shutdown())
+
+
+@pytest.fixture
+def client(run, database, started_app):
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=started_app), base_url="http://test"
+    )
+    yield client
+    run(client.aclose())
+
+
+@pytest.fixture
+def blog(run, database):
+    """
+    One author with a token, one category, three tags and a way to add
+    posts tagged with the first two
+    """
+
+    async def create_base():
+        async with AsyncSessionLocal() as db_session:
+            author = User(
+                username="author",
+                first_name="Ada",
+                last_name="Author",
+                email="author@example.com",
+                password="not-a-hash",
+            )
+            category = Category(name="news")
+            tags = [Tag(name="tag" + str(index)) for index in range(3)]
+            db_session.add_all([author, category, *tags])
+            await db_session.commit()
+            return author.id, category.id, [tag.id for tag in tags]
+
+    author_id, category_id, tag_ids = run(create_base())
+
+    async def add_posts(*bodies: str):
+        async with AsyncSessionLocal() as db_session:
+            tags = [await db_session.get(Tag, tag_id) for tag_id in tag_ids[:2]]
+            posts = [
+                Post(
+                    title="post " + str(index),
+                    body=body,
+                    author_id=author_id,
+                    category_id=category_id,
+                    tags=tags,
+                )
+                for index, body in enumerate(bodies)
+            ]
+            db_session.add_all(posts)
+            await db_session.commit()
+            return [post.id for post in posts]
+
+    return {
+        "author_id": author_id,
+        "category_id": category_id,
+        "tag_ids": tag_ids,
+        "add_posts": add_posts,
+        "headers": {"Authorization": "Bearer " + create_access_token(author_id)},
+    }
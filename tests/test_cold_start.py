@@ -0,0 +1,29 @@
+"""
+    COLD START TESTS
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# wall clock budgets depend on the machine, only checked on request
+@pytest.mark.slow
+@pytest.mark.skipif(
+    os.environ.get("COLD_START_BUDGETS") != "1",
+    reason="set COLD_START_BUDGETS=1 to check the cold start budgets",
+)
+def test_cold_start_within_budget():
+    # a fresh interpreter per measurement, with the default budgets
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.cold_start", "--runs", "1"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,71 @@
+"""
+    POST READ TESTS
+"""
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from app import crud
+from app.core.configuration import settings
+from app.db.query_stats import QueryStats, current_query_stats
+from app.db.session import AsyncSessionLocal
+from app.schemas import PostDisplay
+
+
+def count_queries(run, coroutine):
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        return run(coroutine), stats.count
+    finally:
+        current_query_stats.reset(token)
+
+
+def test_list_posts_loads_tags_in_two_queries(run, blog):
+    run(blog["add_posts"](*["body " + str(index) for index in range(5)]))
+    assert settings.SQLALCHEMY_RAISE_ON_LAZY_LOAD
+
+    async def list_posts():
+        async with AsyncSessionLocal() as db_session:
+            posts = await crud.post.get_multi_async(db_session, limit=10)
+            return posts, [PostDisplay.from_orm(post) for post in posts]
+
+    (posts, displays), queries = count_queries(run, list_posts())
+
+    assert queries == 2
+    assert len(displays) == 5
+    assert all(len(display.tags) == 2 for display in displays)
+    # anything not eagerly loaded raises instead of querying per row
+    with pytest.raises(InvalidRequestError):
+        posts[0].author
+
+
+def test_list_posts_endpoint_with_raising_lazy_loads(run, blog, client):
+    run(blog["add_posts"]("first", "second", "third"))
+
+    response = run(client.get(settings.API_V1_STR + "/post/"))
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == 3
+    assert all(len(item["tags"]) == 2 for item in items)
+
+
+def test_list_posts_validators_follow_the_page(run, blog, client):
+    (post_id, _) = run(blog["add_posts"]("first", "second"))
+    url = settings.API_V1_STR + "/post/"
+
+    etag = run(client.get(url)).headers["ETag"]
+    cached = run(client.get(url, headers={"If-None-Match": etag}))
+    assert cached.status_code == 304
+
+    async def rename():
+        async with AsyncSessionLocal() as db_session:
+            post = await crud.post.get_async(db_session, id_value=post_id)
+            await crud.post.update_async(
+                db_session, db_obj=post, obj_in={"title": "renamed"}
+            )
+
+    run(rename())
+    changed = run(client.get(url, headers={"If-None-Match": etag}))
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
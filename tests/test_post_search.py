@@ -0,0 +1,18 @@
+"""
+    POST SEARCH TESTS
+"""
+from app.core.configuration import settings
+
+
+def test_search_snippet_escapes_the_body(run, blog, client):
+    run(blog["add_posts"]('<script>alert("x")</script> hello <b>world</b>'))
+
+    response = run(
+        client.get(settings.API_V1_STR + "/post/search", params={"keyword": "hello"})
+    )
+
+    assert response.status_code == 200
+    snippet = response.json()[0]["snippet"]
+    assert "<script>" not in snippet and "<b>" not in snippet
+    assert "&lt;script&gt;" in snippet
+    assert "<mark>hello</mark>" in snippet
@@ -0,0 +1,71 @@
+"""
+    POST WRITE TESTS
+"""
+from app.core.configuration import settings
+
+
+def test_bulk_create_reports_the_same_tag_counts_as_create(run, blog, client):
+    tag_ids = blog["tag_ids"][:2]
+
+    def post_in(title: str):
+        return {
+            "title": title,
+            "body": "body of " + title,
+            "category_id": blog["category_id"],
+            "author_id": blog["author_id"],
+            "tags": tag_ids,
+        }
+
+    single = run(
+        client.post(
+            settings.API_V1_STR + "/post/create",
+            json=post_in("single"),
+            headers=blog["headers"],
+        )
+    )
+    bulk = run(
+        client.post(
+            settings.API_V1_STR + "/post/bulk",
+            json=[post_in("bulk 1"), post_in("bulk 2")],
+            headers=blog["headers"],
+        )
+    )
+
+    assert single.status_code == 200 and bulk.status_code == 200
+    assert [tag["post_count"] for tag in single.json()["tags"]] == [1, 1]
+    for post in bulk.json()["created"]:
+        assert [tag["post_count"] for tag in post["tags"]] == [3, 3]
+
+
+def test_only_committed_writes_pin_reads_to_primary(run, blog, client):
+    cookie = settings.READ_YOUR_WRITES_COOKIE
+    create_url = settings.API_V1_STR + "/post/create"
+    post_in = {
+        "title": "pinned",
+        "body": "body",
+        "category_id": blog["category_id"],
+        "author_id": blog["author_id"],
+        "tags": [],
+    }
+
+    unauthenticated = run(client.post(create_url, json=post_in))
+    invalid = run(client.post(create_url, json={}, headers=blog["headers"]))
+    missing = run(
+        client.delete(settings.API_V1_STR + "/post/delete/999", headers=blog["headers"])
+    )
+    rejected = run(
+        client.post(
+            settings.API_V1_STR + "/post/bulk",
+            json=[{**post_in, "category_id": 999}],
+            headers=blog["headers"],
+        )
+    )
+    created = run(client.post(create_url, json=post_in, headers=blog["headers"]))
+
+    assert unauthenticated.status_code == 401 and cookie not in unauthenticated.cookies
+    assert invalid.status_code == 422 and cookie not in invalid.cookies
+    assert missing.status_code == 404 and cookie not in missing.cookies
+    # answered normally, but nothing was written
+    assert rejected.status_code == 200 and rejected.json()["errors"]
+    assert cookie not in rejected.cookies
+    assert created.status_code == 200 and cookie in created.cookies
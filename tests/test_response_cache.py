@@ -0,0 +1,43 @@
+"""
+    RESPONSE CACHE TESTS
+"""
+from starlette.requests import Request
+
+from app.core.conditional import Validators
+from app.core.response_cache import cached_response, response_cache
+
+
+def make_request() -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/v1/tag/",
+            "query_string": b"",
+            "headers": [],
+        }
+    )
+
+
+def test_body_built_across_an_invalidation_is_not_served(run):
+    namespace = "test-race"
+
+    async def stale_build():
+        # a write commits and invalidates while the body is being built
+        await response_cache.invalidate(namespace)
+        return b'["stale"]', Validators(etag='"stale"', last_modified=None)
+
+    async def fresh_build():
+        return b'["fresh"]', Validators(etag='"fresh"', last_modified=None)
+
+    first = run(cached_response(namespace, make_request(), stale_build))
+    assert first.body == b'["stale"]'
+    assert first.headers["X-Cache"] == "MISS"
+
+    second = run(cached_response(namespace, make_request(), fresh_build))
+    assert second.body == b'["fresh"]'
+    assert second.headers["X-Cache"] == "MISS"
+
+    third = run(cached_response(namespace, make_request(), stale_build))
+    assert third.body == b'["fresh"]'
+    assert third.headers["X-Cache"] == "HIT"
@@ -0,0 +1,52 @@
+"""
+    USER DIRECTORY TESTS
+"""
+import pytest
+
+from app import crud
+from app.core.configuration import settings
+from app.crud.user_crud import user_search_index
+from app.db.session import AsyncSessionLocal
+from app.models import User
+
+
+@pytest.fixture
+def directory(run, database):
+    user_search_index.ready = False
+
+    async def add_user(first_name: str):
+        # written straight to the table, as another worker would
+        async with AsyncSessionLocal() as db_session:
+            db_session.add(
+                User(
+                    first_name=first_name,
+                    last_name="Example",
+                    email=first_name.lower() + "@example.com",
+                    password="not-a-hash",
+                )
+            )
+            await db_session.commit()
+
+    async def search(keyword: str):
+        async with AsyncSessionLocal() as db_session:
+            hits = await crud.user.search_directory_async(
+                db_session, keyword=keyword, limit=10
+            )
+            return [user.first_name for user, _ in hits]
+
+    return add_user, search
+
+
+def test_directory_index_picks_up_other_workers_writes(run, directory, monkeypatch):
+    add_user, search = directory
+    run(add_user("Margaret"))
+
+    assert run(search("margret")) == ["Margaret"]
+
+    run(add_user("Bartholomew"))
+    # still within the TTL, the index has not seen the new user
+    assert run(search("bartholomew")) == []
+
+    monkeypatch.setattr(settings, "USER_SEARCH_INDEX_TTL_SECONDS", 0)
+    assert run(search("bartholomew")) == ["Bartholomew"]
+    assert not user_search_index.rebuilding
@@ -0,0 +1,71 @@
+"""
+    VIEW COUNTER TESTS
+"""
+import asyncio
+
+from app.core.view_counter import ViewCounter
+from app.db.query_stats import QueryStats, current_query_stats
+from app.db.session import AsyncSessionLocal
+from app.logger import request_context
+from app.models import Post
+
+
+def test_flushes_run_outside_the_request_context(run, blog):
+    (post_id,) = run(blog["add_posts"]("viewed"))
+    counter = ViewCounter(
+        AsyncSessionLocal, flush_interval=0.05, max_pending=1000, max_posts=10
+    )
+    request_stats = QueryStats()
+    flush_contexts = []
+
+    async def request():
+        # the first view of the worker starts the flusher
+        current_query_stats.set(request_stats)
+        request_context.set({"request_id": "first-view", "scope": {"path": "/"}})
+        counter.record(post_id)
+        counter.record(post_id)
+
+    async def flush_wrapper():
+        flush_contexts.append((current_query_stats.get(), request_context.get()))
+        return await ViewCounter.flush(counter)
+
+    async def views():
+        async with AsyncSessionLocal() as db_session:
+            return (await db_session.get(Post, post_id)).views
+
+    counter.flush = flush_wrapper
+    run(request())
+    run(asyncio.sleep(0.2))
+    run(counter.close())
+
+    assert run(views()) == 2
+    assert request_stats.count == 0
+    assert flush_contexts and set(flush_contexts) == {(None, None)}
+
+
+def test_pending_posts_are_bounded_while_writes_fail(run):
+    class FailingSession:
+        async def __aenter__(self):
+            raise ConnectionError("database down")
+
+        async def __aexit__(self, *excep_info):
+            return False
+
+    counter = ViewCounter(
+        FailingSession, flush_interval=60, max_pending=1000, max_posts=2
+    )
+
+    async def scenario():
+        for post_id in (1, 1, 2, 3, 3):
+            counter.record(post_id)
+        await counter.flush()
+        counter.record(4)
+        await counter.close()
+
+    run(scenario())
+
+    stats = counter.stats()
+    assert stats["pending_posts"] == 2
+    assert stats["pending_views"] == 3
+    assert stats["dropped"] == 3
+    assert stats["failures"] == 2